@@ -0,0 +1,235 @@
+import hashlib
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import orjson
+
+from api.common.constants import CACHE_MAX_BYTES, CACHE_STALE_IF_ERROR, CACHE_STALE_REVALIDATE
+
+
+def cache_key(lang: str, url: str, params: dict | None = None, parser: str = '') -> str:
+    """canonical key: url without query + sorted query params, `page=1` is the default page
+
+    `parser` tells apart different results parsed from the same page
+    """
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query.update({k: str(v) for k, v in (params or {}).items()})
+    if query.get('page') == '1':
+        del query['page']
+    base = urlunsplit(parts._replace(query='', fragment=''))
+    return f'{lang}|{base}?{urlencode(sorted(query.items()))}#{parser}'
+
+
+def encode_payload(value: Any) -> bytes:
+    """JSON of what a response puts under `data`: the items of a (page_size, page_count, data) tuple, otherwise the value"""
+    return orjson.dumps(value[2] if isinstance(value, tuple) else value)
+
+
+def payload_etag(value: Any, encoded: bytes | None = None) -> str:
+    """strong ETag from a hash of the encoded payload"""
+    digest = hashlib.blake2b(digest_size=16)
+    if isinstance(value, tuple):
+        digest.update(repr(value[:2]).encode())
+    digest.update(encode_payload(value) if encoded is None else encoded)
+    return '"' + digest.hexdigest() + '"'
+
+
+# 解析出的 dict/list 大约占其 JSON 长度 3~4 倍的内存, 再加上编码后的 bytes 本身
+PAYLOAD_SIZE_FACTOR = 5
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _splitmix64(i: int) -> int:
+    """the i-th output of splitmix64, unrelated 64-bit multipliers for the sketch rows"""
+    z = (0x9E3779B97F4A7C15 * (i + 1)) & _MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+
+class FrequencySketch:
+    """4-row count-min sketch with periodic halving, the TinyLFU admission filter"""
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        # 宽度取 2 的幂, 每行用不同的奇数乘 64 位哈希, 取乘积的高位作为下标
+        self.shift = 64 - max(width - 1, 1).bit_length()
+        self.width = 1 << (64 - self.shift)
+        self.rows = [[0] * self.width for _ in range(depth)]
+        self.seeds = [_splitmix64(i) | 1 for i in range(depth)]
+        self.sample_size = self.width * 10
+        self.additions = 0
+
+    def _indexes(self, key: str):
+        """one index per row from the high bits of a different multiple of the hash, so rows collide independently"""
+        h = hash(key)
+        for seed in self.seeds:
+            yield ((h * seed) & _MASK64) >> self.shift
+
+    def increment(self, key: str):
+        for row, index in zip(self.rows, self._indexes(key)):
+            if row[index] < 15:
+                row[index] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def _age(self):
+        for row in self.rows:
+            for i, count in enumerate(row):
+                row[i] = count >> 1
+        self.additions //= 2
+
+
+@dataclass
+class Entry:
+    value: Any
+    size: int
+    expires_at: float
+    stored_at: float
+    # 预先编码好的 JSON, 命中缓存时直接写入响应
+    encoded: bytes = field(default=b'', repr=False)
+    _etag: str | None = field(default=None, repr=False)
+
+    def etag(self) -> str:
+        """hashed on first use and kept with the entry"""
+        if self._etag is None:
+            self._etag = payload_etag(self.value, self.encoded)
+        return self._etag
+
+    def age(self) -> int:
+        return int(time.monotonic() - self.stored_at)
+
+    def expired_for(self) -> float:
+        """seconds since the entry expired, negative while it is fresh"""
+        return time.monotonic() - self.expires_at
+
+
+class TinyLFUCache:
+    """Byte-bounded LRU cache with TinyLFU admission.
+
+    A new entry only evicts the least recently used one when it has been
+    requested more often, so one-off pages can not flush out hot listings.
+    Expired entries are kept for `stale` more seconds so `lookup` can still
+    hand them out, they are the first to go when space is needed.
+    All calls happen on the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_bytes: int, stale: float = 0):
+        self.max_bytes = max_bytes
+        self.stale = stale
+        self.bytes = 0
+        self.entries: OrderedDict[str, Entry] = OrderedDict()
+        self.sketch = FrequencySketch()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejections = 0
+        self.stale_hits = 0
+
+    def lookup(self, key: str) -> Entry | None:
+        """the entry for `key`, an expired one is still returned while it is kept around as stale"""
+        self.sketch.increment(key)
+        entry = self.entries.get(key)
+        now = time.monotonic()
+        if entry is None or entry.expires_at + self.stale <= now:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        if entry.expires_at > now:
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry
+
+    def peek(self, key: str) -> Entry | None:
+        """the entry as stored, without counting as an access"""
+        return self.entries.get(key)
+
+    def ttl_left(self, key: str) -> float | None:
+        """seconds until the entry expires, without counting as an access"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        return entry.expires_at - time.monotonic()
+
+    def set(self, key: str, value: Any, ttl: float, encoded: bytes | None = None):
+        if ttl <= 0:
+            return
+        encoded = encode_payload(value) if encoded is None else encoded
+        size = len(encoded) * PAYLOAD_SIZE_FACTOR
+        if size > self.max_bytes:
+            self.rejections += 1
+            return
+        self.pop(key)
+        now = time.monotonic()
+        if self.bytes + size > self.max_bytes:
+            self._evict_expired(now, self.bytes + size - self.max_bytes)
+        candidate_freq = self.sketch.estimate(key)
+        while self.bytes + size > self.max_bytes:
+            victim_key, victim = next(iter(self.entries.items()))
+            if victim.expires_at > now and self.sketch.estimate(victim_key) > candidate_freq:
+                self.rejections += 1
+                return
+            self.pop(victim_key)
+            self.evictions += 1
+        self.entries[key] = Entry(value, size, now + ttl, now, encoded)
+        self.bytes += size
+
+    def _evict_expired(self, now: float, needed: int):
+        """drop every entry past its stale window, then stale ones from the least recently used until `needed` bytes are free
+
+        only runs when the cache is full, so the scan over all entries is rare
+        """
+        dead, stale = [], []
+        for key, entry in self.entries.items():
+            if entry.expires_at + self.stale <= now:
+                dead.append(key)
+            elif entry.expires_at <= now:
+                stale.append(key)
+        freed = evicted = 0
+        for key in dead:
+            freed += self.entries[key].size
+            self.pop(key)
+            evicted += 1
+        for key in stale:
+            if freed >= needed:
+                break
+            freed += self.entries[key].size
+            self.pop(key)
+            evicted += 1
+        self.evictions += evicted
+
+    def pop(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_hits': self.stale_hits,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'rejections': self.rejections,
+        }
+
+
+response_cache = TinyLFUCache(CACHE_MAX_BYTES, max(CACHE_STALE_REVALIDATE, CACHE_STALE_IF_ERROR))
@@ -0,0 +1,128 @@
+import gzip
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from api.common.constants import (
+    CAPTURE_DIR,
+    CAPTURE_MAX_BYTES,
+    CAPTURE_MAX_FILES,
+    CAPTURE_MODES,
+    CAPTURE_SAMPLE_N,
+)
+
+logger = logging.getLogger(__name__)
+
+ERRORS = 'errors'
+PARSE_FAILURES = 'parse_failures'
+SAMPLE = 'sample'
+
+
+@dataclass
+class Capture:
+    kind: str
+    url: str
+    status: int
+    body: bytes
+    error: str = ''
+
+
+class ResponseCapture:
+    """Keep a few upstream responses on disk for debugging parsers.
+
+    Bodies are truncated to `max_bytes`, gzip compressed and written by a
+    background thread into a ring directory of at most `max_files` files.
+    When the writer falls behind, captures are dropped instead of slowing
+    down requests.
+    """
+
+    def __init__(self, modes: frozenset, sample_n: int, max_bytes: int, directory: str, max_files: int):
+        self.modes = modes - {'off'}
+        self.sample_n = max(sample_n, 1)
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_files = max_files
+        self.queue: queue.Queue[Capture | None] = queue.Queue(maxsize=64)
+        self.files: deque[str] = deque()
+        self.counter = itertools.count()
+        self.seq = itertools.count()
+        self.thread: threading.Thread | None = None
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.modes)
+
+    def wants(self, mode: str) -> bool:
+        return mode in self.modes
+
+    def sampled(self) -> bool:
+        """decide up front, so streaming fetches know whether to keep the body"""
+        return SAMPLE in self.modes and next(self.counter) % self.sample_n == 0
+
+    def record(self, kind: str, url: str, status: int, body: bytes | str, error: str = ''):
+        if self.thread is None:
+            return
+        if isinstance(body, str):
+            body = body.encode('utf-8', 'replace')
+        try:
+            self.queue.put_nowait(Capture(kind, url, status, body[:self.max_bytes], error))
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        if not self.enabled or self.thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.files.extend(sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.gz')))
+        self.thread = threading.Thread(target=self._run, name='response-capture', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        while (capture := self.queue.get()) is not None:
+            try:
+                self._write(capture)
+            except OSError:
+                logger.exception('failed to write response capture')
+
+    def _write(self, capture: Capture):
+        name = f'{time.strftime("%Y%m%d-%H%M%S")}-{next(self.seq):06d}-{capture.kind}.html.gz'
+        path = os.path.join(self.directory, name)
+        header = f'<!-- {capture.url} status={capture.status} {capture.error} -->\n'.encode('utf-8', 'replace')
+        with gzip.open(path, 'wb', compresslevel=6) as f:
+            f.write(header)
+            f.write(capture.body)
+        self.files.append(path)
+        self.written += 1
+        while len(self.files) > self.max_files:
+            try:
+                os.remove(self.files.popleft())
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> dict:
+        return {
+            'modes': sorted(self.modes),
+            'written': self.written,
+            'dropped': self.dropped,
+            'pending': self.queue.qsize(),
+            'files': len(self.files),
+        }
+
+
+response_capture = ResponseCapture(
+    CAPTURE_MODES, CAPTURE_SAMPLE_N, CAPTURE_MAX_BYTES, CAPTURE_DIR, CAPTURE_MAX_FILES)
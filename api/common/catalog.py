@@ -0,0 +1,458 @@
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from api.common.constants import CATALOG_MAX_AGE, CATALOG_PATH
+from api.common.pasrer import (
+    parse_movie_detail,
+    parse_movie_list,
+    parse_movie_search,
+    parse_playlist_detail,
+    parse_uncensored_moives,
+)
+from api.domain.record import MovieCard, MovieDetail
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS movies (
+    number TEXT NOT NULL,
+    language TEXT NOT NULL,
+    display_number TEXT,
+    title TEXT,
+    link TEXT,
+    cover TEXT,
+    preview TEXT,
+    duration TEXT,
+    description TEXT,
+    jp_title TEXT,
+    release_date TEXT,
+    actress TEXT,
+    genres TEXT,
+    series TEXT,
+    maker TEXT,
+    director TEXT,
+    tags TEXT,
+    seen_at REAL,
+    detail_at REAL,
+    PRIMARY KEY (number, language)
+);
+CREATE INDEX IF NOT EXISTS movies_language ON movies (language);
+CREATE INDEX IF NOT EXISTS movies_maker ON movies (maker);
+CREATE INDEX IF NOT EXISTS movies_series ON movies (series);
+CREATE INDEX IF NOT EXISTS movies_release_date ON movies (release_date);
+CREATE TABLE IF NOT EXISTS movie_actresses (
+    number TEXT NOT NULL,
+    language TEXT NOT NULL,
+    actress TEXT NOT NULL,
+    PRIMARY KEY (number, language, actress)
+);
+CREATE INDEX IF NOT EXISTS movie_actresses_actress ON movie_actresses (actress);
+CREATE TABLE IF NOT EXISTS movie_genres (
+    number TEXT NOT NULL,
+    language TEXT NOT NULL,
+    genre TEXT NOT NULL,
+    PRIMARY KEY (number, language, genre)
+);
+CREATE INDEX IF NOT EXISTS movie_genres_genre ON movie_genres (genre);
+CREATE TABLE IF NOT EXISTS sync_state (
+    category TEXT NOT NULL,
+    language TEXT NOT NULL,
+    high_water TEXT,
+    pages INTEGER,
+    details INTEGER,
+    synced_at REAL,
+    PRIMARY KEY (category, language)
+);
+'''
+
+# 全文索引, 以 movies 为外部内容表, 由触发器保持同步
+# unicode61 会把连续的中日韩文字当成一个词, 写入前用 cjk_segment 拆成单字, 查询时按短语匹配
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS movies_fts USING fts5(
+    display_number, title, jp_title, actress, tags, description,
+    content='movies', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS movies_fts_insert AFTER INSERT ON movies BEGIN
+    INSERT INTO movies_fts (rowid, display_number, title, jp_title, actress, tags, description)
+    VALUES (new.rowid, cjk_segment(new.display_number), cjk_segment(new.title), cjk_segment(new.jp_title),
+                       cjk_segment(new.actress), cjk_segment(new.tags), cjk_segment(new.description));
+END;
+CREATE TRIGGER IF NOT EXISTS movies_fts_delete AFTER DELETE ON movies BEGIN
+    INSERT INTO movies_fts (movies_fts, rowid, display_number, title, jp_title, actress, tags, description)
+    VALUES ('delete', old.rowid, cjk_segment(old.display_number), cjk_segment(old.title), cjk_segment(old.jp_title),
+                                 cjk_segment(old.actress), cjk_segment(old.tags), cjk_segment(old.description));
+END;
+CREATE TRIGGER IF NOT EXISTS movies_fts_update AFTER UPDATE ON movies BEGIN
+    INSERT INTO movies_fts (movies_fts, rowid, display_number, title, jp_title, actress, tags, description)
+    VALUES ('delete', old.rowid, cjk_segment(old.display_number), cjk_segment(old.title), cjk_segment(old.jp_title),
+                                 cjk_segment(old.actress), cjk_segment(old.tags), cjk_segment(old.description));
+    INSERT INTO movies_fts (rowid, display_number, title, jp_title, actress, tags, description)
+    VALUES (new.rowid, cjk_segment(new.display_number), cjk_segment(new.title), cjk_segment(new.jp_title),
+                       cjk_segment(new.actress), cjk_segment(new.tags), cjk_segment(new.description));
+END;
+'''
+
+# 索引的写法变化时加一, 旧目录打开时重建全文索引 (记在 PRAGMA user_version)
+FTS_VERSION = 2
+
+DROP_FTS = '''
+DROP TRIGGER IF EXISTS movies_fts_insert;
+DROP TRIGGER IF EXISTS movies_fts_delete;
+DROP TRIGGER IF EXISTS movies_fts_update;
+DROP TABLE IF EXISTS movies_fts;
+'''
+
+# 'rebuild' 直接读 movies 的原文, 所以用同样拆分过的内容逐行重建
+REINDEX_FTS = '''
+INSERT INTO movies_fts (rowid, display_number, title, jp_title, actress, tags, description)
+SELECT rowid, cjk_segment(movies.display_number), cjk_segment(movies.title), cjk_segment(movies.jp_title),
+              cjk_segment(movies.actress), cjk_segment(movies.tags), cjk_segment(movies.description) FROM movies
+'''
+
+# bm25 列权重, 顺序同 movies_fts 的列
+FTS_WEIGHTS = (10.0, 5.0, 3.0, 4.0, 2.0, 1.0)
+
+# 上游 search 的 filters 中本地能判断的部分, 按番号后缀匹配
+LOCAL_FILTERS = {
+    'uncensored-leak': '%-uncensored-leak',
+    'chinese-subtitle': '%-chinese-subtitle',
+    'english-subtitle': '%-english-subtitle',
+}
+
+# 上游 search 的 sort 中本地能实现的部分, None 表示按相关度
+LOCAL_SORTS = {
+    None: 'rank',
+    'released_at': 'm.release_date DESC',
+}
+
+TERM_PATTERN = re.compile(r'\w+')
+# 中日韩文字, 索引里每个字是一个词
+CJK_PATTERN = re.compile('([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff66-\uff9f])')
+
+UPSERT_CARD = '''
+INSERT INTO movies (number, language, display_number, title, link, cover, preview, duration, seen_at)
+VALUES (:number, :language, :display_number, :title, :link, :cover, :preview, :duration, :seen_at)
+ON CONFLICT (number, language) DO UPDATE SET
+    display_number = COALESCE(movies.display_number, excluded.display_number),
+    title = COALESCE(movies.title, excluded.title),
+    link = COALESCE(movies.link, excluded.link),
+    cover = COALESCE(movies.cover, excluded.cover),
+    preview = excluded.preview,
+    duration = excluded.duration,
+    seen_at = excluded.seen_at
+'''
+
+UPSERT_DETAIL = '''
+INSERT INTO movies (number, language, display_number, title, link, cover, description, jp_title, release_date,
+                    actress, genres, series, maker, director, tags, seen_at, detail_at)
+VALUES (:number, :language, :display_number, :title, :link, :cover, :description, :jp_title, :release_date,
+        :actress, :genres, :series, :maker, :director, :tags, :seen_at, :seen_at)
+ON CONFLICT (number, language) DO UPDATE SET
+    display_number = excluded.display_number,
+    title = excluded.title,
+    link = excluded.link,
+    cover = excluded.cover,
+    description = excluded.description,
+    jp_title = excluded.jp_title,
+    release_date = excluded.release_date,
+    actress = excluded.actress,
+    genres = excluded.genres,
+    series = excluded.series,
+    maker = excluded.maker,
+    director = excluded.director,
+    tags = excluded.tags,
+    seen_at = excluded.seen_at,
+    detail_at = excluded.detail_at
+'''
+
+# parse_movie_detail 输出的字段, 目录里按同样的形状返回
+DETAIL_FIELDS = ('title', 'link', 'description', 'cover', 'release_date', 'number', 'jp_title')
+DETAIL_EXTRA_FIELDS = ('actress', 'genres', 'series', 'maker', 'director', 'tags')
+CARD_FIELDS = ('title', 'link', 'number', 'cover', 'preview', 'duration')
+
+
+def split_names(value: str | None) -> list[str]:
+    """"a, b" -> ['a', 'b']"""
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def cjk_segment(text: str | None) -> str | None:
+    """put spaces around every CJK character, so the tokenizer indexes each one as a word"""
+    return text if not text else CJK_PATTERN.sub(r' \1 ', text)
+
+
+def match_query(keyword: str) -> str:
+    """every word of the keyword as a quoted prefix term, "ssis-20" -> '"ssis"* "20"*'
+
+    CJK words become phrases of their characters, "秘密" -> '"秘 密"*' matches them anywhere in a title
+    """
+    return ' '.join('"' + ' '.join(cjk_segment(term).split()) + '"*' for term in TERM_PATTERN.findall(keyword))
+
+
+def actress_pattern(keyword: str) -> str:
+    """LIKE pattern for actress names: a name prefix, CJK names also match in the middle ("悠亜" finds "三上悠亜")"""
+    keyword = keyword.strip()
+    return ('%' if CJK_PATTERN.search(keyword) else '') + keyword + '%'
+
+
+def _cards(parser, ret) -> list[MovieCard]:
+    if parser is parse_movie_search:
+        return ret[2].moives
+    return ret[2]
+
+
+class Catalog:
+    """Local SQLite catalog of every movie card and detail page the API has parsed.
+
+    Writes are queued and applied in batches by a background thread, reads go
+    through a separate connection on the caller, WAL lets both run at once.
+    """
+
+    def __init__(self, path: str, max_age: int):
+        self.path = path
+        self.max_age = max_age
+        self.queue: queue.Queue[tuple | None] = queue.Queue(maxsize=1024)
+        self.thread: threading.Thread | None = None
+        self.reader: sqlite3.Connection | None = None
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.reader is not None
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # 全文索引的触发器要用
+        conn.create_function('cjk_segment', 1, cjk_segment, deterministic=True)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def start(self):
+        if not self.path or self.thread is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        writer = self.connect()
+        writer.executescript(SCHEMA)
+        version = writer.execute('PRAGMA user_version').fetchone()[0]
+        if version < FTS_VERSION:
+            # 新目录, 或者全文索引还是旧的写法
+            writer.executescript(DROP_FTS)
+        writer.executescript(FTS_SCHEMA)
+        if version < FTS_VERSION:
+            with writer:
+                writer.execute(REINDEX_FTS)
+            writer.execute(f'PRAGMA user_version = {FTS_VERSION}')
+        self.reader = self.connect()
+        self.thread = threading.Thread(target=self._run, args=(writer,), name='catalog-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.reader.close()
+        self.reader = None
+
+    def record(self, lang: str, parser, ret: Any):
+        """queue the parsed result of a page for upsert, parsers that carry no movies are ignored"""
+        if self.thread is None or ret is None:
+            return
+        if parser is parse_movie_detail:
+            item = ('detail', lang, ret)
+        elif parser in (parse_movie_list, parse_uncensored_moives, parse_movie_search, parse_playlist_detail):
+            item = ('cards', lang, _cards(parser, ret))
+        else:
+            return
+        self._put(item)
+
+    def record_sync(self, category: str, lang: str, high_water: str | None, pages: int, details: int):
+        """queue the result of a sync run, an unchanged listing keeps its previous high-water mark"""
+        if self.thread is not None:
+            self._put(('sync', lang, (category, high_water, pages, details)))
+
+    def _put(self, item: tuple):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self, conn: sqlite3.Connection):
+        running = True
+        while running:
+            items = [self.queue.get()]
+            # 一次事务写入队列里已有的全部记录
+            while len(items) < 256:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in items:
+                running = False
+                items = [item for item in items if item is not None]
+            try:
+                with conn:
+                    for kind, lang, data in items:
+                        if kind == 'detail':
+                            self._upsert_detail(conn, lang, data)
+                        elif kind == 'sync':
+                            self._upsert_sync(conn, lang, *data)
+                        else:
+                            self._upsert_cards(conn, lang, data)
+                self.written += len(items)
+            except sqlite3.Error:
+                logger.exception('failed to write %d catalog records', len(items))
+        conn.close()
+
+    def _upsert_cards(self, conn: sqlite3.Connection, lang: str, cards: list[MovieCard]):
+        now = time.time()
+        conn.executemany(UPSERT_CARD, [{
+            'number': card.number.lower(),
+            'language': lang,
+            'display_number': card.number,
+            **{field: getattr(card, field) for field in CARD_FIELDS if field != 'number'},
+            'seen_at': now,
+        } for card in cards if card.number])
+
+    def _upsert_detail(self, conn: sqlite3.Connection, lang: str, movie: MovieDetail):
+        if not movie.number:
+            return
+        number = movie.number.lower()
+        conn.execute(UPSERT_DETAIL, {
+            'number': number,
+            'language': lang,
+            'display_number': movie.number,
+            **{field: getattr(movie, field) for field in DETAIL_FIELDS + DETAIL_EXTRA_FIELDS if field != 'number'},
+            'seen_at': time.time(),
+        })
+        conn.execute('DELETE FROM movie_actresses WHERE number = ? AND language = ?', (number, lang))
+        conn.execute('DELETE FROM movie_genres WHERE number = ? AND language = ?', (number, lang))
+        conn.executemany('INSERT OR IGNORE INTO movie_actresses VALUES (?, ?, ?)',
+                         [(number, lang, name) for name in split_names(movie.actress)])
+        conn.executemany('INSERT OR IGNORE INTO movie_genres VALUES (?, ?, ?)',
+                         [(number, lang, name) for name in split_names(movie.genres)])
+
+    def _upsert_sync(self, conn: sqlite3.Connection, lang: str, category: str, high_water: str | None,
+                     pages: int, details: int):
+        conn.execute('''
+            INSERT INTO sync_state VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (category, language) DO UPDATE SET
+                high_water = COALESCE(excluded.high_water, sync_state.high_water),
+                pages = excluded.pages, details = excluded.details, synced_at = excluded.synced_at
+        ''', (category, lang, high_water, pages, details, time.time()))
+
+    def sync_state(self, category: str, lang: str) -> dict | None:
+        if self.reader is None:
+            return None
+        row = self.reader.execute('SELECT * FROM sync_state WHERE category = ? AND language = ?',
+                                  (category, lang)).fetchone()
+        return dict(row) if row is not None else None
+
+    def detailed(self, lang: str, numbers: list[str]) -> set[str]:
+        """the numbers (lower case) whose detail page is already in the catalog"""
+        if self.reader is None or not numbers:
+            return set()
+        numbers = [number.lower() for number in numbers]
+        rows = self.reader.execute(
+            f'SELECT number FROM movies WHERE language = ? AND detail_at IS NOT NULL '
+            f'AND number IN ({", ".join("?" * len(numbers))})', [lang, *numbers]).fetchall()
+        return {row[0] for row in rows}
+
+    def get_detail(self, lang: str, number: str) -> MovieDetail | None:
+        """the movie as parse_movie_detail returned it, if its detail page was parsed within max_age"""
+        if self.reader is None:
+            return None
+        row = self.reader.execute(
+            'SELECT * FROM movies WHERE number = ? AND language = ? AND detail_at >= ?',
+            (number.lower(), lang, time.time() - self.max_age)).fetchone()
+        if row is None:
+            return None
+        movie = MovieDetail(**{field: row[field] for field in DETAIL_FIELDS if field != 'number'})
+        movie.number = row['display_number']
+        if row['actress'] is not None:
+            for field in DETAIL_EXTRA_FIELDS:
+                setattr(movie, field, row[field])
+        return movie
+
+    def search(self, lang: str, actress: str | None = None, genre: str | None = None, maker: str | None = None,
+               series: str | None = None, released_from: str | None = None, released_to: str | None = None,
+               page: int = 1, page_size: int = 24) -> tuple[int, list[dict]]:
+        """(total, movies) matching every given filter, newest release first"""
+        if self.reader is None:
+            return 0, []
+        where, args = ['m.language = ?'], [lang]
+        if actress:
+            where.append('m.number IN (SELECT number FROM movie_actresses WHERE actress = ? AND language = ?)')
+            args += [actress, lang]
+        if genre:
+            where.append('m.number IN (SELECT number FROM movie_genres WHERE genre = ? AND language = ?)')
+            args += [genre, lang]
+        for column, value in (('maker', maker), ('series', series)):
+            if value:
+                where.append(f'm.{column} = ?')
+                args.append(value)
+        if released_from:
+            where.append('m.release_date >= ?')
+            args.append(released_from)
+        if released_to:
+            where.append('m.release_date <= ?')
+            args.append(released_to)
+        clause = ' AND '.join(where)
+        total = self.reader.execute(f'SELECT COUNT(*) FROM movies m WHERE {clause}', args).fetchone()[0]
+        rows = self.reader.execute(
+            f'SELECT * FROM movies m WHERE {clause} ORDER BY m.release_date DESC, m.number LIMIT ? OFFSET ?',
+            args + [page_size, (page - 1) * page_size]).fetchall()
+        return total, [self._row(row) for row in rows]
+
+    def full_text(self, lang: str, keyword: str, filters: str | None = None, sort: str | None = None,
+                  page: int = 1, page_size: int = 24) -> tuple[int, list[dict], list[dict]]:
+        """(total, movies, actresses) for a keyword, ranked by bm25 unless `sort` says otherwise
+
+        every word matches as a prefix over number, title, jp_title, actress, tags and description
+        """
+        query = match_query(keyword)
+        if self.reader is None or not query:
+            return 0, [], []
+        where, args = ['movies_fts MATCH ?', 'm.language = ?'], [query, lang]
+        if filters:
+            where.append('m.number LIKE ?')
+            args.append(LOCAL_FILTERS[filters])
+        clause = ' AND '.join(where)
+        source = 'movies_fts JOIN movies m ON m.rowid = movies_fts.rowid'
+        total = self.reader.execute(f'SELECT COUNT(*) FROM {source} WHERE {clause}', args).fetchone()[0]
+        weights = ', '.join(map(str, FTS_WEIGHTS))
+        rows = self.reader.execute(
+            f'SELECT m.*, bm25(movies_fts, {weights}) AS rank FROM {source} WHERE {clause} '
+            f'ORDER BY {LOCAL_SORTS[sort]}, m.number LIMIT ? OFFSET ?',
+            args + [page_size, (page - 1) * page_size]).fetchall()
+        actresses = self.reader.execute(
+            'SELECT DISTINCT actress FROM movie_actresses WHERE language = ? AND actress LIKE ? LIMIT 10',
+            (lang, actress_pattern(keyword))).fetchall()
+        return total, [self._row(row) for row in rows], [{"name": row[0]} for row in actresses]
+
+    def _row(self, row: sqlite3.Row) -> dict:
+        movie = {key: row[key] for key in row.keys()
+                 if row[key] is not None and key not in ('number', 'display_number', 'language', 'seen_at', 'detail_at', 'rank')}
+        movie['number'] = row['display_number']
+        return movie
+
+    def stats(self) -> dict:
+        stats = {'enabled': self.enabled, 'written': self.written, 'dropped': self.dropped,
+                 'pending': self.queue.qsize()}
+        if self.reader is not None:
+            stats['movies'], stats['details'] = self.reader.execute(
+                'SELECT COUNT(*), COUNT(detail_at) FROM movies').fetchone()
+        return stats
+
+
+catalog = Catalog(CATALOG_PATH, CATALOG_MAX_AGE)
@@ -1,3 +1,92 @@
+import os
+
 HEADERS = headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
 }
+
+# 上游站点地址, 压测时可指向本地桩服务
+UPSTREAM_BASE_URL = os.getenv('MISSCORE_UPSTREAM_BASE_URL', 'https://missav.ai').rstrip('/')
+# 上游请求超时（秒）
+UPSTREAM_TIMEOUT = float(os.getenv('MISSCORE_UPSTREAM_TIMEOUT', 30))
+# 上游连接池
+UPSTREAM_MAX_CONNECTIONS = int(os.getenv('MISSCORE_UPSTREAM_MAX_CONNECTIONS', 100))
+UPSTREAM_MAX_KEEPALIVE = int(os.getenv('MISSCORE_UPSTREAM_MAX_KEEPALIVE', 20))
+UPSTREAM_KEEPALIVE_EXPIRY = float(
+    os.getenv('MISSCORE_UPSTREAM_KEEPALIVE_EXPIRY', 30))
+UPSTREAM_HTTP2 = os.getenv('MISSCORE_UPSTREAM_HTTP2', '1') == '1'
+
+# 解析结果缓存, TTL 单位为秒, 0 表示不缓存
+CACHE_MAX_BYTES = int(os.getenv('MISSCORE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_TTL_HOT = int(os.getenv('MISSCORE_CACHE_TTL_HOT', 300))
+CACHE_TTL_LISTING = int(os.getenv('MISSCORE_CACHE_TTL_LISTING', 900))
+CACHE_TTL_SEARCH = int(os.getenv('MISSCORE_CACHE_TTL_SEARCH', 600))
+CACHE_TTL_RANKING = int(os.getenv('MISSCORE_CACHE_TTL_RANKING', 3600))
+CACHE_TTL_INDEX = int(os.getenv('MISSCORE_CACHE_TTL_INDEX', 86400))
+CACHE_TTL_DETAIL = int(os.getenv('MISSCORE_CACHE_TTL_DETAIL', 86400))
+CACHE_TTL_PRIVATE = 0
+# 过期后仍保留的秒数: 这段时间内先返回旧结果并在后台刷新; 上游出错时返回旧结果
+CACHE_STALE_REVALIDATE = int(os.getenv('MISSCORE_CACHE_STALE_REVALIDATE', 300))
+CACHE_STALE_IF_ERROR = int(os.getenv('MISSCORE_CACHE_STALE_IF_ERROR', 86400))
+
+# 批量查询时同时请求上游的数量
+BATCH_CONCURRENCY = int(os.getenv('MISSCORE_BATCH_CONCURRENCY', 8))
+BATCH_MAX_ITEMS = int(os.getenv('MISSCORE_BATCH_MAX_ITEMS', 200))
+
+# 上游响应采样留存, 逗号分隔: off | errors | parse_failures | sample
+CAPTURE_MODES = frozenset(
+    m.strip() for m in os.getenv('MISSCORE_CAPTURE', 'errors,parse_failures').split(',') if m.strip())
+CAPTURE_SAMPLE_N = int(os.getenv('MISSCORE_CAPTURE_SAMPLE_N', 1000))
+CAPTURE_MAX_BYTES = int(os.getenv('MISSCORE_CAPTURE_MAX_BYTES', 512 * 1024))
+CAPTURE_DIR = os.getenv('MISSCORE_CAPTURE_DIR', 'logs/captures')
+CAPTURE_MAX_FILES = int(os.getenv('MISSCORE_CAPTURE_MAX_FILES', 200))
+# 流式解析失败时留存的 body 末尾字节数, 没被抽样的请求只保留这么多
+CAPTURE_TAIL_BYTES = int(os.getenv('MISSCORE_CAPTURE_TAIL_BYTES', 64 * 1024))
+
+# 日志: 根日志级别, 输出格式 text | json, 以及按 logger 覆盖级别, 如 "api=INFO,httpx=WARNING"
+LOG_LEVEL = os.getenv('MISSCORE_LOG_LEVEL', 'DEBUG').upper()
+LOG_FORMAT = os.getenv('MISSCORE_LOG_FORMAT', 'text').lower()
+LOG_LEVELS = os.getenv('MISSCORE_LOG_LEVELS', '')
+
+# 一次范围请求最多抓取的页数
+LISTING_MAX_PAGES = int(os.getenv('MISSCORE_LISTING_MAX_PAGES', 20))
+# 流式抓取整个列表时预取的页数
+CRAWL_PREFETCH = int(os.getenv('MISSCORE_CRAWL_PREFETCH', 4))
+
+# 本地影片目录 (SQLite), 路径为空时关闭
+CATALOG_PATH = os.getenv('MISSCORE_CATALOG_PATH', 'data/catalog.db')
+# 目录里的详情在这个时间内直接返回, 不再请求上游
+CATALOG_MAX_AGE = int(os.getenv('MISSCORE_CATALOG_MAX_AGE', CACHE_TTL_DETAIL))
+
+# 增量同步: 间隔秒数 (0 表示不在进程内定时同步), 语言, 单次最多翻页数, 连续多少个已知番号后停止, 每秒请求数
+SYNC_INTERVAL = int(os.getenv('MISSCORE_SYNC_INTERVAL', 0))
+SYNC_LANGS = [lang.strip() for lang in os.getenv('MISSCORE_SYNC_LANGS', 'en').split(',') if lang.strip()]
+SYNC_MAX_PAGES = int(os.getenv('MISSCORE_SYNC_MAX_PAGES', 50))
+SYNC_KNOWN_RUN = int(os.getenv('MISSCORE_SYNC_KNOWN_RUN', 24))
+SYNC_RATE = float(os.getenv('MISSCORE_SYNC_RATE', 2))
+SYNC_CONCURRENCY = int(os.getenv('MISSCORE_SYNC_CONCURRENCY', 2))
+
+# 缓存预热: 是否开启, 语言, 过期前多少秒刷新, 并发数, 上游在途请求超过多少时让路给用户请求
+WARM = os.getenv('MISSCORE_WARM', '0') == '1'
+WARM_LANGS = [lang.strip() for lang in os.getenv('MISSCORE_WARM_LANGS', 'en').split(',') if lang.strip()]
+WARM_TARGETS = [name.strip() for name in os.getenv('MISSCORE_WARM_TARGETS', '').split(',') if name.strip()]
+WARM_LEAD = int(os.getenv('MISSCORE_WARM_LEAD', 30))
+WARM_CONCURRENCY = int(os.getenv('MISSCORE_WARM_CONCURRENCY', 2))
+WARM_BUSY = int(os.getenv('MISSCORE_WARM_BUSY', 8))
+
+# 登录会话保存的位置 (SQLite, 多个 worker 共用), 路径为空时只在进程内存中, 只能用单个 worker
+SESSION_PATH = os.getenv('MISSCORE_SESSION_PATH', 'data/sessions.db')
+# 登录会话: 闲置多少秒后过期, 最多保存多少个 (超出时淘汰最久未使用的)
+SESSION_IDLE = int(os.getenv('MISSCORE_SESSION_IDLE', 7 * 86400))
+SESSION_MAX = int(os.getenv('MISSCORE_SESSION_MAX', 10000))
+
+# 上游限速: 每个站点每秒请求数和突发量 (0 表示不限), 每个登录用户的每秒请求数和突发量, 同时在途的请求上限,
+# 被限流 (429/503/Cloudflare 验证) 后速率减半, 最低降到 MIN_RATE, 每秒恢复 RECOVERY, 排队超过 QUEUE_TIMEOUT 秒直接返回 503
+GOVERNOR_RATE = float(os.getenv('MISSCORE_GOVERNOR_RATE', 20))
+GOVERNOR_BURST = float(os.getenv('MISSCORE_GOVERNOR_BURST', 40))
+GOVERNOR_SESSION_RATE = float(os.getenv('MISSCORE_GOVERNOR_SESSION_RATE', 10))
+# 默认突发量够一次满额的 /batch, 单个 batch 只受站点限速约束
+GOVERNOR_SESSION_BURST = float(os.getenv('MISSCORE_GOVERNOR_SESSION_BURST', BATCH_MAX_ITEMS))
+GOVERNOR_CONCURRENCY = int(os.getenv('MISSCORE_GOVERNOR_CONCURRENCY', 64))
+GOVERNOR_MIN_RATE = float(os.getenv('MISSCORE_GOVERNOR_MIN_RATE', 0.5))
+GOVERNOR_RECOVERY = float(os.getenv('MISSCORE_GOVERNOR_RECOVERY', 0.5))
+GOVERNOR_QUEUE_TIMEOUT = float(os.getenv('MISSCORE_GOVERNOR_QUEUE_TIMEOUT', 10))
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import math
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException
+
+from api.common.constants import (
+    GOVERNOR_BURST,
+    GOVERNOR_CONCURRENCY,
+    GOVERNOR_MIN_RATE,
+    GOVERNOR_QUEUE_TIMEOUT,
+    GOVERNOR_RATE,
+    GOVERNOR_RECOVERY,
+    GOVERNOR_SESSION_BURST,
+    GOVERNOR_SESSION_RATE,
+)
+
+logger = logging.getLogger(__name__)
+
+# 按会话限速时最多记住的会话数
+MAX_SESSION_BUCKETS = 1024
+
+
+class UpstreamBusy(HTTPException):
+    """503 with Retry-After, upstream is throttling us or the queue for it is too long"""
+
+    def __init__(self, retry_after: float):
+        super().__init__(status_code=503, detail='Upstream is busy, retry later',
+                         headers={'Retry-After': str(max(1, math.ceil(retry_after)))})
+
+
+def throttled(response: httpx.Response) -> bool:
+    """429 / 503, or a Cloudflare challenge page instead of the content"""
+    return response.status_code in (429, 503) or response.headers.get('cf-mitigated') == 'challenge'
+
+
+def retry_after(response: httpx.Response) -> float | None:
+    try:
+        return max(float(response.headers.get('retry-after', '')), 0.0)
+    except ValueError:
+        # HTTP 日期格式的 Retry-After 按没有处理
+        return None
+
+
+class TokenBucket:
+    """Token bucket whose tokens may be reserved ahead, a negative balance is the queue in front of a caller.
+
+    `backoff` halves the rate (at most once per refill interval), time adds it back
+    `recovery` per second, so the rate recovers by itself once upstream stops throttling.
+    """
+
+    def __init__(self, rate: float, burst: float, min_rate: float = 0.0, recovery: float = 0.0):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+        self.backoff_at = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.recovery * elapsed)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def reserve(self, now: float) -> float:
+        """take a token, returns the seconds until it is actually available"""
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def cancel(self):
+        self.tokens += 1
+
+    def backoff(self, now: float, pause: float | None = None):
+        self._refill(now)
+        if now >= self.backoff_at:
+            # 同一波限流里的多个响应只减速一次
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.backoff_at = now + 1 / self.rate
+        # 清空积攒的 burst, Retry-After 期间的令牌记为欠账
+        self.tokens = min(self.tokens, 0.0, -(pause or 0.0) * self.rate)
+
+
+class Governor:
+    """Pace every upstream call: a token bucket per host, one per logged in user and a global concurrency cap.
+
+    A call that would wait longer than its queue timeout fails at once with 503 instead of
+    piling up, throttling responses slow the host bucket down.
+    """
+
+    def __init__(self, rate: float, burst: float, session_rate: float, session_burst: float,
+                 concurrency: int, min_rate: float, recovery: float, queue_timeout: float):
+        self.rate = rate
+        self.burst = burst
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.min_rate = min_rate
+        self.recovery = recovery
+        self.queue_timeout = queue_timeout
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency > 0 else None
+        self.hosts: dict[str, TokenBucket] = {}
+        self.sessions: OrderedDict[str, TokenBucket] = OrderedDict()
+        self.waiting = 0
+        self.active = 0
+        self.counters = Counter()
+
+    def _host_bucket(self, url: str) -> TokenBucket | None:
+        if self.rate <= 0:
+            return None
+        host = urlsplit(url).netloc
+        bucket = self.hosts.get(host)
+        if bucket is None:
+            bucket = self.hosts[host] = TokenBucket(self.rate, self.burst, self.min_rate, self.recovery)
+        return bucket
+
+    def _session_bucket(self, cookies: dict | None) -> TokenBucket | None:
+        # 同一个用户的 cookie 都带着 user_uuid, 不论是会话 token 还是直接传的 cookie
+        user = cookies.get('user_uuid') if cookies else None
+        if self.session_rate <= 0 or not user:
+            return None
+        bucket = self.sessions.get(user)
+        if bucket is None:
+            bucket = self.sessions[user] = TokenBucket(self.session_rate, self.session_burst)
+            if len(self.sessions) > MAX_SESSION_BUCKETS:
+                self.sessions.popitem(last=False)
+        else:
+            self.sessions.move_to_end(user)
+        return bucket
+
+    @asynccontextmanager
+    async def slot(self, url: str, cookies: dict | None = None,
+                   queue_timeout: float | None = None) -> AsyncIterator[None]:
+        """wait for the rate limits and a free concurrency slot, raises UpstreamBusy past `queue_timeout`"""
+        now = time.monotonic()
+        deadline = now + (self.queue_timeout if queue_timeout is None else queue_timeout)
+        buckets = [bucket for bucket in (self._host_bucket(url), self._session_bucket(cookies)) if bucket]
+        wait = max((bucket.reserve(now) for bucket in buckets), default=0.0)
+        if now + wait > deadline:
+            for bucket in buckets:
+                bucket.cancel()
+            self.counters['rejected'] += 1
+            raise UpstreamBusy(wait)
+        self.waiting += 1
+        try:
+            if wait > 0:
+                self.counters['delayed'] += 1
+                await asyncio.sleep(wait)
+            if self.semaphore is not None:
+                if self.semaphore.locked():
+                    await asyncio.wait_for(self.semaphore.acquire(), max(deadline - time.monotonic(), 0.001))
+                else:
+                    await self.semaphore.acquire()
+        except BaseException as e:
+            # 没能发出请求, 预留的令牌还回去
+            for bucket in buckets:
+                bucket.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.counters['rejected'] += 1
+                raise UpstreamBusy(1) from None
+            raise
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            if self.semaphore is not None:
+                self.semaphore.release()
+
+    def observe(self, url: str, response: httpx.Response):
+        """slow the host down when upstream throttled this response"""
+        if not throttled(response):
+            return
+        self.counters['throttled'] += 1
+        bucket = self._host_bucket(url)
+        if bucket is not None:
+            bucket.backoff(time.monotonic(), retry_after(response))
+            logger.warning('upstream throttled %s with %d, rate now %.2f/s',
+                           urlsplit(url).netloc, response.status_code, bucket.rate)
+
+    def stats(self) -> dict:
+        return {
+            'concurrency': self.concurrency,
+            'active': self.active,
+            'waiting': self.waiting,
+            'hosts': {host: round(bucket.rate, 2) for host, bucket in self.hosts.items()},
+            'sessions': len(self.sessions),
+            'delayed': self.counters['delayed'],
+            'rejected': self.counters['rejected'],
+            'throttled': self.counters['throttled'],
+        }
+
+
+governor = Governor(GOVERNOR_RATE, GOVERNOR_BURST, GOVERNOR_SESSION_RATE, GOVERNOR_SESSION_BURST,
+                    GOVERNOR_CONCURRENCY, GOVERNOR_MIN_RATE, GOVERNOR_RECOVERY, GOVERNOR_QUEUE_TIMEOUT)
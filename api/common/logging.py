@@ -1,22 +1,79 @@
-
+import atexit
+import copy
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
+import queue
+
+from api.common.constants import LOG_FORMAT, LOG_LEVEL, LOG_LEVELS
+
+_listener: QueueListener | None = None
+_exc_formatter = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """one compact JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': self.formatTime(record, self.datefmt),
+            'level': record.levelname,
+            'logger': record.name,
+            'file': f'{record.filename}:{record.lineno}',
+            'msg': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _QueueHandler(QueueHandler):
+    """like QueueHandler, but keeps the traceback in exc_text instead of folding it into msg"""
 
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exc_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
 
-def setup_logging():
 
-    log_dir = 'logs'
+def parse_levels(spec: str) -> dict[str, str]:
+    """"api=INFO,httpx=WARNING" -> {'api': 'INFO', 'httpx': 'WARNING'}"""
+    levels = {}
+    for item in spec.split(','):
+        name, sep, level = item.partition('=')
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(log_dir: str = 'logs', level: str = LOG_LEVEL, fmt: str = LOG_FORMAT,
+                  levels: str = LOG_LEVELS) -> QueueListener:
+    """attach a QueueHandler to the root logger, formatting and file IO happen on the listener thread"""
+    global _listener
+    if _listener is not None:
+        return _listener
+
     os.makedirs(log_dir, exist_ok=True)
     # 创建根日志器
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(level)
 
     # 定义日志格式
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
+    if fmt == 'json':
+        formatter = JsonFormatter(datefmt='%Y-%m-%dT%H:%M:%S')
+    else:
+        formatter = logging.Formatter(
+            '[%(asctime)s] %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
 
     # 控制台处理器（开发环境）
     console_handler = logging.StreamHandler()
@@ -25,7 +82,7 @@ def setup_logging():
 
     # 文件处理器（生产环境）
     file_handler = RotatingFileHandler(
-        filename='logs/app.log',
+        filename=os.path.join(log_dir, 'app.log'),
         maxBytes=10*1024*1024,  # 10MB
         backupCount=5,
         encoding='utf-8'
@@ -35,18 +92,47 @@ def setup_logging():
 
     # 错误日志专用处理器
     error_handler = RotatingFileHandler(
-        filename='logs/error.log',
+        filename=os.path.join(log_dir, 'error.log'),
         maxBytes=5*1024*1024,
-        backupCount=3
+        backupCount=3,
+        encoding='utf-8'
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(formatter)
 
-    # 添加处理器
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-    logger.addHandler(error_handler)
+    # 请求线程只把记录放进队列, 格式化/写文件/滚动都在监听线程里完成
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(_QueueHandler(log_queue))
+    _listener = QueueListener(log_queue, console_handler, file_handler, error_handler,
+                              respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
 
     # 禁用第三方库的冗余日志
     logging.getLogger('urllib3').setLevel(logging.WARNING)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    logging.getLogger('httpcore').setLevel(logging.WARNING)
+    # HTTP/2 默认开启, hpack 每个头部块都会打几条 DEBUG
+    logging.getLogger('hpack').setLevel(logging.WARNING)
+    logging.getLogger('h2').setLevel(logging.WARNING)
     logging.getLogger('sqlalchemy').setLevel(logging.ERROR)
+
+    # 环境变量里按 logger 覆盖级别
+    for name, name_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(name_level)
+    return _listener
+
+
+def stop_logging():
+    """flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
@@ -1,8 +1,11 @@
+import hashlib
+from functools import lru_cache
 from typing import List, Tuple
 
-from fastapi import FastAPI, Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import FastAPI
+from starlette.datastructures import MutableHeaders
 from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 translations = {
     "us": "en",
@@ -35,36 +38,130 @@ translations = {
 }
 
 
-# 中间件实现
-class LanguageMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        accept_language = request.headers.get(
-            "accept-language", translations['en'])
-        # 将语言存储在请求上下文中
-        request.state.lang = self.select_language(
-            self.parse_accept_language(accept_language))
-        response = await call_next(request)
-        response.headers["Content-Language"] = request.state.lang
-        return response
-
-    def parse_accept_language(self, header: str) -> List[Tuple[str, float]]:
-        """解析 Accept-Language 头部，返回排序后的语言列表"""
-        langs = []
-        for part in header.split(","):
-            lang_part = part.split(";")[0].strip()
-            q = 1.0
-            if "q=" in part:
-                q = float(part.split("q=")[1].split(",")[0])
-            langs.append((lang_part, q))
-        if langs:
-            # 按权重降序排序
-            langs.sort(key=lambda x: x[1], reverse=True)
-        return langs
-
-    def select_language(self, langs: List[Tuple[str, float]]) -> str:
-        if langs:
-            return translations.get(langs[0][0], translations['en'])
-        return translations['en']
+@lru_cache(maxsize=256)
+def parse_accept_language(header: str) -> List[Tuple[str, float]]:
+    """解析 Accept-Language 头部，返回排序后的语言列表"""
+    langs = []
+    for part in header.split(","):
+        lang_part = part.split(";")[0].strip()
+        q = 1.0
+        if "q=" in part:
+            q = float(part.split("q=")[1].split(",")[0])
+        langs.append((lang_part, q))
+    if langs:
+        # 按权重降序排序
+        langs.sort(key=lambda x: x[1], reverse=True)
+    return langs
+
+
+def select_language(langs: List[Tuple[str, float]]) -> str:
+    if langs:
+        return translations.get(langs[0][0], translations['en'])
+    return translations['en']
+
+
+# 中间件实现, 直接实现 ASGI 接口, 不经过 BaseHTTPMiddleware 的请求/响应包装
+class LanguageMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        accept_language = translations['en']
+        for name, value in scope['headers']:
+            if name == b'accept-language':
+                accept_language = value.decode('latin-1')
+                break
+        # 将语言存储在请求上下文中, request.state 读的就是 scope['state']
+        lang = select_language(parse_accept_language(accept_language))
+        state = scope.setdefault('state', {})
+        state['lang'] = lang
+        # 处理函数需要追加的响应头, 如缓存的 Age
+        response_headers = state['response_headers'] = {}
+
+        async def send_with_headers(message: Message):
+            if message['type'] == 'http.response.start':
+                headers = MutableHeaders(scope=message)
+                headers['Content-Language'] = lang
+                headers.update(response_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class ConditionalMiddleware:
+    """ETag / Cache-Control from the payloads a handler used, 304 when If-None-Match matches"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        # 处理函数通过 record_payload 记录 (etag, max_age), 流式响应把它设为 None
+        state = scope.setdefault('state', {})
+        state['validators'] = []
+        if scope['method'] not in ('GET', 'HEAD'):
+            await self.app(scope, receive, send)
+            return
+        not_modified = False
+
+        async def send_with_validators(message: Message):
+            nonlocal not_modified
+            if message['type'] == 'http.response.start':
+                # 响应开始时处理函数已经返回, validators 已经齐全
+                validators = state.get('validators')
+                if message['status'] != 200 or not validators:
+                    await send(message)
+                    return
+                etag, cache_control = self.validator_headers(validators)
+                headers = MutableHeaders(scope=message)
+                headers['ETag'] = etag
+                headers['Cache-Control'] = cache_control
+                # 内容随语言和登录用户变化, 客户端缓存不能跨语言或跨用户复用
+                headers.add_vary_header('Accept-Language')
+                if self.header(scope, b'auth-key'):
+                    headers.add_vary_header('auth-key')
+                if self.matches(self.header(scope, b'if-none-match'), etag):
+                    not_modified = True
+                    # 304 保留原响应的头 (CORS, Vary 等), 只去掉描述 body 的
+                    del headers['content-length']
+                    del headers['content-type']
+                    await send({**message, 'status': 304})
+                    await send({'type': 'http.response.body', 'body': b''})
+                    return
+            elif not_modified:
+                # 304 没有 body, 丢弃原响应的内容
+                return
+            await send(message)
+
+        await self.app(scope, receive, send_with_validators)
+
+    def validator_headers(self, validators: list[tuple[str, int]]) -> tuple[str, str]:
+        """(ETag, Cache-Control), several payloads combine into one ETag and the shortest max-age"""
+        if len(validators) == 1:
+            etag = validators[0][0]
+        else:
+            combined = ','.join(etag for etag, _ in validators).encode()
+            etag = '"' + hashlib.blake2b(combined, digest_size=16).hexdigest() + '"'
+        max_age = min(max_age for _, max_age in validators)
+        return etag, f'private, max-age={max_age}' if max_age > 0 else 'private, no-cache'
+
+    def header(self, scope: Scope, name: bytes) -> str:
+        for key, value in scope['headers']:
+            if key == name:
+                return value.decode('latin-1')
+        return ''
+
+    def matches(self, if_none_match: str, etag: str) -> bool:
+        """If-None-Match uses weak comparison, `*` matches any current representation"""
+        if not if_none_match:
+            return False
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return etag in tags or '*' in tags
 
 
 def register_middlewares(app: FastAPI):
@@ -73,4 +170,5 @@ def register_middlewares(app: FastAPI):
                        allow_credentials=["*"],
                        allow_methods=["*"],
                        allow_headers=["*"])
+    app.add_middleware(ConditionalMiddleware)
     app.add_middleware(LanguageMiddleware)
@@ -1,9 +1,93 @@
 import re
+import threading
 from typing import Any
 from urllib.parse import urlparse, urlunparse
 
 from fastapi import HTTPException
-from lxml import etree
+from lxml import etree, html
+
+from api.domain.record import (
+    Actress,
+    ActressRank,
+    Genre,
+    MovieCard,
+    MovieDetail,
+    MovieMeta,
+    MovieSearch,
+    Playlist,
+    PlaylistMovieCard,
+)
+
+
+class ClassXPath:
+    """Match elements carrying all of `classes`.
+
+    A cheap contains(@class) prefilter runs in libxml2, then the exact
+    class tokens are checked in Python, instead of building a
+    normalize-space/concat string for every candidate element.
+    """
+
+    def __init__(self, path: str, classes: str, extra: str = ''):
+        self.classes = frozenset(classes.split())
+        predicate = ' and '.join(f'contains(@class, "{c}")' for c in sorted(self.classes))
+        if extra:
+            predicate = f'{extra} and {predicate}'
+        self.xpath = etree.XPath(f'{path}[{predicate}]')
+
+    def __call__(self, tree) -> list:
+        return [el for el in self.xpath(tree) if self.classes.issubset(el.get('class', '').split())]
+
+
+def _children(tag: str):
+    return lambda el: list(el.iterchildren(tag))
+
+
+def _descendants(tag: str):
+    return lambda el: list(el.iterdescendants(tag))
+
+
+# 所有选择器在导入时编译一次; 按标签取子元素/后代元素直接走 lxml 迭代器, 比逐个元素执行 XPath 更快
+XPATHS = {
+    'login_button': ClassXPath('//a', 'bg-primary', extra="contains(text(), '登入')"),
+    'delete_token': etree.XPath('//input[@type="hidden" and @name="_token"]'),
+    'genres_grid': ClassXPath('//div', 'grid grid-cols-2 md:grid-cols-3 xl:grid-cols-4 gap-4'),
+    'movie_cards': ClassXPath('//div', 'aspect-w-16 aspect-h-9 rounded'),
+    'playlists': etree.XPath('//ul[@role="list" and @class="space-y-4"]'),
+    'pages': etree.XPath('//a[contains(@aria-label, "Go to page")]'),
+    'movie_meta': etree.XPath(
+        '//meta[@property="og:title" or @property="og:url" or @property="og:description" or @property="og:image"]'),
+    'movie_info': etree.XPath('//div[@class="space-y-2"]'),
+    'movie_info_rows': etree.XPath('.//div[@class="text-secondary"]'),
+    'search_actress': ClassXPath('//div', 'max-w-full mb-6 text-nord4 rounded-lg'),
+    'actress_grid': ClassXPath('//div', 'max-w-full p-8 text-nord4 bg-nord1 rounded-lg'),
+    'playlist_comments': etree.XPath('//textarea[@x-ref="comment" and @name="description"]'),
+    'child_a': _children('a'),
+    'child_p': _children('p'),
+    'child_img': _children('img'),
+    'child_video': _children('video'),
+    'descendant_a': _descendants('a'),
+    'descendant_p': _descendants('p'),
+    'descendant_div': _descendants('div'),
+    'descendant_li': _descendants('li'),
+    'descendant_h4': _descendants('h4'),
+    'descendant_img': _descendants('img'),
+    'descendant_span': _descendants('span'),
+}
+PAGE_PATTERN = re.compile(r'Go to page (\d+)')
+
+_local = threading.local()
+
+
+def html_parser() -> html.HTMLParser:
+    """lxml parsers are not thread safe, so each thread reuses its own"""
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = html.HTMLParser(collect_ids=False)
+    return parser
+
+
+def parse_html(text: str | bytes):
+    return html.fromstring(text, parser=html_parser())
 
 
 def parse_url(url: str):
@@ -13,132 +97,104 @@ def parse_url(url: str):
 
 
 def parse_login(tree):
-    login_button_xpath = '''
-            //a[
-                contains(text(), '登入')
-                and
-                contains(concat(' ', normalize-space(@class), ' '), ' bg-primary ')
-            ]
-        '''
-    login_buttons = tree.xpath(login_button_xpath)
+    login_buttons = XPATHS['login_button'](tree)
     if len(login_buttons) != 0:
         raise HTTPException(status_code=401, detail='Unauthorized')
 
 
 def __parse_delete_token(tree) -> str:
-    input_xpath = etree.XPath('//input[@type="hidden" and @name="_token"]')
-    return input_xpath(tree)[0].get("value", "")
-
-
-def __parse_genres(tree, is_subtitle: bool = True) -> list[dict]:
-    div_xpath = etree.XPath('''
-        //div[
-        contains(concat(' ', normalize-space(@class), ' '), ' grid ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' grid-cols-2 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' md:grid-cols-3 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' xl:grid-cols-4 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' gap-4 ')
-    ]
-    ''')
+    return XPATHS['delete_token'](tree)[0].get("value", "")
+
+
+def __parse_genres(tree, is_subtitle: bool = True) -> list[Genre]:
     genres = []
-    for div in etree.XPath('.//div')(div_xpath(tree)[0]):
-        a = etree.XPath('a')(div)[0]
-        p = etree.XPath('p')(div)[0]
-        genres.append({
-            "name": a.text.strip(),
-            "link": a.get('href', ''),
-            "count": int(p.text_content().strip().split(" ")[0])
-        })
+    for div in XPATHS['descendant_div'](XPATHS['genres_grid'](tree)[0]):
+        a = XPATHS['child_a'](div)[0]
+        p = XPATHS['child_p'](div)[0]
+        genres.append(Genre(
+            name=a.text.strip(),
+            link=a.get('href', ''),
+            count=int(p.text_content().strip().split(" ")[0]),
+        ))
     return genres
 
 
-def __parse_links(tree, is_subtitle: bool = True) -> list[dict]:
-    div_xpath = etree.XPath('''
-        //div[
-        contains(concat(' ', normalize-space(@class), ' '), ' aspect-w-16 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' aspect-h-9 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' rounded ')
-    ]
-    ''')
-    links = []
-    for div in div_xpath(tree):
-        a = etree.XPath('a')(div)
-        image = etree.XPath('img')(a[0])[0]
-        video = etree.XPath('video')(a[0])[0]
-        subtitle_duration = a[0:-1]
-        link_info = {
-            "title": image.get('alt', ''),
-            "link": a[0].get('href', ''),
-            "number": a[0].get('alt', ''),
-            "cover": image.get('data-src', ''),
-            "preview": video.get('data-src', ''),
-            "duration": a[-1].text_content().strip()
-        }
-        if is_subtitle and len(subtitle_duration) == 2:
-            link_info.update({
-                'is_subtitle': True,
-                'subtitle': subtitle_duration[1].text_content().strip()
-            })
-        links.append(link_info)
-    return links
+def parse_movie_card(div, is_subtitle: bool = True, record: type[MovieCard] = MovieCard) -> MovieCard:
+    a = XPATHS['child_a'](div)
+    image = XPATHS['child_img'](a[0])[0]
+    video = XPATHS['child_video'](a[0])[0]
+    subtitle_duration = a[0:-1]
+    card = record(
+        title=image.get('alt', ''),
+        link=a[0].get('href', ''),
+        number=a[0].get('alt', ''),
+        cover=image.get('data-src', ''),
+        preview=video.get('data-src', ''),
+        duration=a[-1].text_content().strip(),
+    )
+    if is_subtitle and len(subtitle_duration) == 2:
+        card.is_subtitle = True
+        card.subtitle = subtitle_duration[1].text_content().strip()
+    return card
+
 
+def __parse_links(tree, is_subtitle: bool = True, record: type[MovieCard] = MovieCard) -> list[MovieCard]:
+    return [parse_movie_card(div, is_subtitle, record) for div in XPATHS['movie_cards'](tree)]
 
-def __parse_playlists(tree) -> list[dict]:
-    playlists_xpath = etree.XPath('//ul[@role="list" and @class="space-y-4"]')
+
+def __parse_playlists(tree) -> list[Playlist]:
     links = []
-    for ul in playlists_xpath(tree):
-        for item in etree.XPath('.//a')(ul):
-            p = etree.XPath('.//p')(item)
+    for ul in XPATHS['playlists'](tree):
+        for item in XPATHS['descendant_a'](ul):
+            p = XPATHS['descendant_p'](item)
             update_at = p[3].text.strip().split(" ")[1] if len(
                 p) == 4 else p[4].text.strip().split(" ")[1]
-            link_info = {
-                "name": p[0].text.strip(),
-                "key": item.get('href', '').split("/")[-1],
-                "link": item.get('href', ''),
-                "scope": p[1].text_content().strip(),
-                "owner": p[2].text_content().strip(),
-                "updated_at": update_at,
-            }
-            links.append(link_info)
+            links.append(Playlist(
+                name=p[0].text.strip(),
+                key=item.get('href', '').split("/")[-1],
+                link=item.get('href', ''),
+                scope=p[1].text_content().strip(),
+                owner=p[2].text_content().strip(),
+                updated_at=update_at,
+            ))
     return links
 
 
 def __parse_page(tree) -> int:
-    page_selector = etree.XPath('//a[contains(@aria-label, "Go to page")]')
-    pages = page_selector(tree)
+    pages = XPATHS['pages'](tree)
     if pages:
-        match = re.search(r'Go to page (\d+)', pages[-1].get("aria-label"))
+        match = PAGE_PATTERN.search(pages[-1].get("aria-label"))
         if match:
             return int(match.group(1))
     else:
         return 0
 
 
-def parse_movie_detail(tree) -> dict:
-    meta_info = etree.XPath(
-        '//meta[@property="og:title" or @property="og:url" or @property="og:description" or @property="og:image"]')
+OG_PROPERTIES = {
+    "og:title": "title",
+    "og:url": "link",
+    "og:description": "description",
+    "og:image": "cover",
+}
+
+
+def __parse_meta(tree) -> dict:
     movie_info = {}
-    for meta in meta_info(tree):
+    for meta in XPATHS['movie_meta'](tree):
         property = meta.get("property", "")
-        content = meta.get("content", "")
-        if property == "og:title":
-            movie_info['title'] = content
-        elif property == "og:url":
-            movie_info['link'] = content
-        elif property == "og:description":
-            movie_info['description'] = content
-        elif property == "og:image":
-            movie_info['cover'] = content
-    div_xpath = etree.XPath(
-        '//div[@class="space-y-2"]')
-    div_info = etree.XPath(
-        './/div[@class="text-secondary"]')(div_xpath(tree)[0])
+        if property in OG_PROPERTIES:
+            movie_info[OG_PROPERTIES[property]] = meta.get("content", "")
+    return movie_info
+
+
+def parse_movie_meta(tree) -> MovieMeta:
+    """title, link, description and cover from the og:* meta tags in <head>"""
+    return MovieMeta(**__parse_meta(tree))
+
+
+def parse_movie_detail(tree) -> MovieDetail:
+    movie_info = __parse_meta(tree)
+    div_info = XPATHS['movie_info_rows'](XPATHS['movie_info'](tree)[0])
     release_date = div_info[0].text_content().strip().split("\n")[1].strip()
     number = div_info[1].text_content().strip().split("\n")[1].strip()
     jp_title = div_info[2].text_content().strip().split("\n")[1].strip()
@@ -158,39 +214,29 @@ def parse_movie_detail(tree) -> dict:
         movie_info['maker'] = maker
         movie_info['director'] = director
         movie_info['tags'] = tags
-    return movie_info
+    return MovieDetail(**movie_info)
 
 
-def parse_movie_list(tree) -> tuple[int, int, Any]:
+def parse_movie_list(tree) -> tuple[int, int, list[MovieCard]]:
     data = __parse_links(tree)
     return (len(data), __parse_page(tree), data)
 
 
-def parse_movie_search(tree) -> tuple[int, int, Any]:
-    data = {
-        "actress": __parse_actress(tree, div_xpath=etree.XPath('''
-        //div[
-        contains(concat(' ', normalize-space(@class), ' '), ' max-w-full ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' mb-6 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' text-nord4 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' rounded-lg ')
-    ]
-    ''')),
-        "moives": __parse_links(tree)
-    }
+def parse_movie_search(tree) -> tuple[int, int, MovieSearch]:
+    data = MovieSearch(
+        actress=__parse_actress(tree, div_xpath=XPATHS['search_actress']),
+        moives=__parse_links(tree),
+    )
     # Besides the movie, the actresses also need to be analyzed.
-    return (len(data["moives"]), __parse_page(tree), data)
+    return (len(data.moives), __parse_page(tree), data)
 
 
-def parse_movie_genres(tree) -> tuple[int, int, Any]:
+def parse_movie_genres(tree) -> tuple[int, int, list[Genre]]:
     data = __parse_genres(tree)
     return (len(data), __parse_page(tree), data)
 
 
-def parse_uncensored_moives(tree) -> tuple[int, int, Any]:
+def parse_uncensored_moives(tree) -> tuple[int, int, list[MovieCard]]:
     data = __parse_links(tree, is_subtitle=False)
     return (len(data), __parse_page(tree), data)
 
@@ -199,17 +245,17 @@ def parse_actress_info(tree) -> dict:
     pass
 
 
-def parse_actress_list(tree) -> tuple[int, int, Any]:
+def parse_actress_list(tree) -> tuple[int, int, list[Actress]]:
     data = __parse_actress(tree)
     return (len(data), __parse_page(tree), data)
 
 
-def parse_actress_ranking(tree) -> list[Any]:
+def parse_actress_ranking(tree) -> list[ActressRank]:
     data = __parse_actress_ranking(tree)
     return data
 
 
-def parse_playlists(tree) -> tuple[int, int, Any]:
+def parse_playlists(tree) -> tuple[int, int, list[Playlist]]:
     data = __parse_playlists(tree)
     return (len(data), __parse_page(tree), data)
 
@@ -218,86 +264,155 @@ def parse_playlist_delete_token(tree) -> str:
     return __parse_delete_token(tree)
 
 
-def parse_playlist_detail(tree) -> tuple[int, int, Any]:
-    data = __parse_links(tree)
+def parse_playlist_detail(tree) -> tuple[int, int, list[PlaylistMovieCard]]:
+    data = __parse_links(tree, record=PlaylistMovieCard)
     comments = __parse_playlist_comment(tree)
     for index, comment in enumerate(comments):
-        data[index].update({
-            "comment": comment
-        })
+        data[index].comment = comment
     return (len(data), __parse_page(tree), data)
 
 
 def __parse_playlist_comment(tree) -> tuple[int, int, Any]:
-    comment_xpath = etree.XPath(
-        '//textarea[@x-ref="comment" and @name="description"]')
     comments = []
-    for comment in comment_xpath(tree):
+    for comment in XPATHS['playlist_comments'](tree):
         comments.append(comment.text_content().strip())
     return comments
 
 
-def __parse_actress(tree, div_xpath=etree.XPath('''
-        //div[
-        contains(concat(' ', normalize-space(@class), ' '), ' max-w-full ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' p-8 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' text-nord4 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' bg-nord1 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' rounded-lg ')
-    ]
-    ''')) -> list[dict]:
+def __parse_actress(tree, div_xpath=XPATHS['actress_grid']) -> list[Actress]:
     actress = []
     div = div_xpath(tree)[0]
-    for li in etree.XPath('.//li')(div):
-        a = etree.XPath('.//a')(li)[1]
-        name = etree.XPath('.//h4')(a)[0]
-        p = etree.XPath('p')(a)
+    for li in XPATHS['descendant_li'](div):
+        a = XPATHS['descendant_a'](li)[1]
+        name = XPATHS['descendant_h4'](a)[0]
+        p = XPATHS['child_p'](a)
         videos = p[0]
-        cover = etree.XPath('.//img')(li)
-        actress_info = {
-            "name": name.text.strip(),
-            "link": a.get('href', ''),
-            "videos": int(videos.text.strip().split(" ")[0]),
-            "cover": cover[0].get('src', '') if len(cover) > 0 else ''
-        }
+        cover = XPATHS['descendant_img'](li)
+        actress_info = Actress(
+            name=name.text.strip(),
+            link=a.get('href', ''),
+            videos=int(videos.text.strip().split(" ")[0]),
+            cover=cover[0].get('src', '') if len(cover) > 0 else '',
+        )
         if len(p) == 2:
-            actress_info.update({
-                "debut": p[1].text.strip().split(" ")[0],
-            })
+            actress_info.debut = p[1].text.strip().split(" ")[0]
         actress.append(actress_info)
     return actress
 
 
-def __parse_actress_ranking(tree) -> list[dict]:
-    div_xpath = etree.XPath('''
-        //div[
-        contains(concat(' ', normalize-space(@class), ' '), ' max-w-full ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' p-8 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' text-nord4 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' bg-nord1 ')
-        and
-        contains(concat(' ', normalize-space(@class), ' '), ' rounded-lg ')
-    ]
-    ''')
+def __parse_actress_ranking(tree) -> list[ActressRank]:
     actress = []
-    div = div_xpath(tree)[0]
-    for li in etree.XPath('.//li')(div):
-        a = etree.XPath('.//a')(li)[1]
-        name = etree.XPath('.//h4')(a)[0]
-        span = etree.XPath('.//span')(a)[0]
-        cover = etree.XPath('.//img')(li)
-        actress_info = {
-            "name": name.text.strip(),
-            "link": a.get('href', ''),
-            "rank": span.text.strip(),
-            "cover": cover[0].get('src', '') if len(cover) > 0 else ''
-        }
-        actress.append(actress_info)
+    div = XPATHS['actress_grid'](tree)[0]
+    for li in XPATHS['descendant_li'](div):
+        a = XPATHS['descendant_a'](li)[1]
+        name = XPATHS['descendant_h4'](a)[0]
+        span = XPATHS['descendant_span'](a)[0]
+        cover = XPATHS['descendant_img'](li)
+        actress.append(ActressRank(
+            name=name.text.strip(),
+            link=a.get('href', ''),
+            rank=span.text.strip(),
+            cover=cover[0].get('src', '') if len(cover) > 0 else '',
+        ))
     return actress
+
+
+class MovieListFeed:
+    """Incremental parse_movie_list / parse_uncensored_moives.
+
+    Upstream bytes are fed as they arrive; each movie card is extracted
+    as soon as its element is closed, and every finished subtree outside
+    a card is dropped right away, so the whole document is never kept.
+    """
+
+    def __init__(self, is_subtitle: bool = True, encoding: str | None = None, check_login: bool = True):
+        self.is_subtitle = is_subtitle
+        # 匿名抓取公开页面时页面上本来就有登入按钮, 不当作 401
+        self.check_login = check_login
+        self.parser = etree.HTMLPullParser(events=('start', 'end'), tag=('div', 'a'), encoding=encoding)
+        self.parser.set_element_class_lookup(html.HtmlElementClassLookup())
+        self.cards_classes = XPATHS['movie_cards'].classes
+        self.login_classes = XPATHS['login_button'].classes
+        self.card_depth = 0
+        self.last_page_label = None
+        self.login = False
+        self.cards = []
+        self.done = False
+
+    def _is_card(self, el) -> bool:
+        return el.tag == 'div' and self.cards_classes.issubset(el.get('class', '').split())
+
+    def _drain(self) -> list[MovieCard]:
+        cards = []
+        for event, el in self.parser.read_events():
+            if event == 'start':
+                if self._is_card(el):
+                    self.card_depth += 1
+                continue
+            if self._is_card(el):
+                self.card_depth -= 1
+                cards.append(parse_movie_card(el, self.is_subtitle))
+            elif self.card_depth:
+                continue
+            elif el.tag == 'a':
+                if 'Go to page' in el.get('aria-label', ''):
+                    self.last_page_label = el.get('aria-label')
+                if self.check_login and '登入' in (el.text or '') and self.login_classes.issubset(el.get('class', '').split()):
+                    self.login = True
+            el.clear(keep_tail=False)
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+        self.cards.extend(cards)
+        return cards
+
+    def feed(self, data: bytes) -> list[MovieCard]:
+        """feed a chunk, returns the cards completed by it"""
+        self.parser.feed(data)
+        return self._drain()
+
+    def close(self) -> tuple[int, int, list[MovieCard]]:
+        self.parser.close()
+        self._drain()
+        if self.login:
+            raise HTTPException(status_code=401, detail='Unauthorized')
+        page = 0
+        if self.last_page_label is not None:
+            match = PAGE_PATTERN.search(self.last_page_label)
+            page = int(match.group(1)) if match else None
+        return (len(self.cards), page, self.cards)
+
+
+class MovieMetaFeed:
+    """Incremental parse_movie_meta that is done as soon as </head> is parsed,
+    so the caller can stop reading the detail page body.
+
+    The login button lives in <body>, so this feed does not run parse_login.
+    """
+
+    def __init__(self, encoding: str | None = None):
+        self.parser = etree.HTMLPullParser(events=('end',), tag=('meta', 'head'), encoding=encoding)
+        self.movie_info = {}
+        self.done = False
+
+    def feed(self, data: bytes):
+        self.parser.feed(data)
+        for _, el in self.parser.read_events():
+            if el.tag == 'head':
+                self.done = True
+                break
+            property = el.get("property", "")
+            if property in OG_PROPERTIES:
+                self.movie_info[OG_PROPERTIES[property]] = el.get("content", "")
+
+    def close(self) -> MovieMeta:
+        self.parser.close()
+        return MovieMeta(**self.movie_info)
+
+
+# 可以边下载边解析的页面
+STREAM_PARSERS = {
+    parse_movie_meta: lambda encoding, check_login: MovieMetaFeed(encoding=encoding),
+    parse_movie_list: lambda encoding, check_login: MovieListFeed(encoding=encoding, check_login=check_login),
+    parse_uncensored_moives: lambda encoding, check_login: MovieListFeed(is_subtitle=False, encoding=encoding,
+                                                                         check_login=check_login),
+}
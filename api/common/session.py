@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import secrets
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+
+from api.common import upstream
+from api.common.constants import SESSION_IDLE, SESSION_MAX, SESSION_PATH, UPSTREAM_BASE_URL
+from api.common.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    token TEXT PRIMARY KEY,
+    cookies TEXT NOT NULL,
+    email TEXT NOT NULL,
+    password TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used);
+'''
+
+# last_used 变化超过这么多秒才写回, 避免每个请求都写一次
+TOUCH_INTERVAL = 60
+
+
+async def upstream_login(email: str, password: str) -> tuple[int, dict | None]:
+    """(status, cookies) of a missav login, cookies is None when the login failed"""
+    response = await upstream.post(url=f'{UPSTREAM_BASE_URL}/api/login',
+                                   data={'email': email, 'password': password})
+    if response.status_code == 200:
+        cookies = dict(response.cookies)
+        if "user_uuid" in cookies:
+            return response.status_code, cookies
+    return response.status_code, None
+
+
+@dataclass
+class Session:
+    token: str
+    cookies: dict
+    # 上游会话过期时用来重新登录
+    email: str
+    password: str
+    last_used: float = field(default_factory=time.time)
+    # 每次重新登录加一, 并发的 401 只触发一次登录
+    generation: int = 0
+
+
+class SessionStore:
+    """Opaque token -> upstream cookies of a logged in user.
+
+    Sessions live in a SQLite table, so every worker process resolves every token
+    and a restart keeps them. Each process keeps its own Session objects in least
+    recently used order, so requests of one session share one cookies dict.
+    """
+
+    def __init__(self, path: str, idle: int, max_sessions: int):
+        # 路径为空时只保存在本进程内存中, 只适用于单个 worker
+        self.path = path
+        self.idle = idle
+        self.max_sessions = max_sessions
+        self.conn: sqlite3.Connection | None = None
+        self.sessions: OrderedDict[str, Session] = OrderedDict()
+        self.flight = SingleFlight()
+        self.created = 0
+        self.expired = 0
+        self.relogins = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self.conn is None:
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path or ':memory:', check_same_thread=False, isolation_level=None)
+            if self.path:
+                # 表里有账号密码, 只允许本用户读写
+                os.chmod(self.path, 0o600)
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA busy_timeout=5000')
+            conn.executescript(SCHEMA)
+            self.conn = conn
+        return self.conn
+
+    def stop(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self.sessions.clear()
+
+    def _expire(self, now: float):
+        db = self._db()
+        self.expired += db.execute('DELETE FROM sessions WHERE last_used <= ?', (now - self.idle,)).rowcount
+        # 超出上限时淘汰最久未使用的
+        self.expired += db.execute('''
+            DELETE FROM sessions WHERE token IN (
+                SELECT token FROM sessions ORDER BY last_used DESC LIMIT -1 OFFSET ?)
+        ''', (self.max_sessions - 1,)).rowcount
+
+    def create(self, cookies: dict, email: str, password: str) -> str:
+        now = time.time()
+        self._expire(now)
+        token = secrets.token_urlsafe(24)
+        self._db().execute('INSERT INTO sessions VALUES (?, ?, ?, ?, ?, 0)',
+                           (token, json.dumps(cookies), email, password, now))
+        self._remember(Session(token, cookies, email, password, now))
+        self.created += 1
+        return token
+
+    def get(self, token: str) -> Session | None:
+        row = self._db().execute('SELECT cookies, email, password, last_used, generation FROM sessions WHERE token = ?',
+                                 (token,)).fetchone()
+        if row is None:
+            # 别的进程让它过期或删除了
+            self.sessions.pop(token, None)
+            return None
+        cookies, email, password, last_used, generation = row
+        now = time.time()
+        if now - last_used >= self.idle:
+            self._forget(token)
+            self.expired += 1
+            return None
+        if now - last_used >= TOUCH_INTERVAL:
+            self._db().execute('UPDATE sessions SET last_used = ? WHERE token = ?', (now, token))
+        session = self.sessions.get(token)
+        if session is None:
+            session = self._remember(Session(token, json.loads(cookies), email, password, now, generation))
+        elif session.generation != generation:
+            # 别的进程已经重新登录, 原地换成新的 cookie
+            self._load(session, json.loads(cookies), generation)
+        session.last_used = now
+        self.sessions.move_to_end(token)
+        return session
+
+    def _remember(self, session: Session) -> Session:
+        self.sessions[session.token] = session
+        if len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+        return session
+
+    def _forget(self, token: str):
+        self.sessions.pop(token, None)
+        self._db().execute('DELETE FROM sessions WHERE token = ?', (token,))
+
+    def _load(self, session: Session, cookies: dict, generation: int):
+        # 原地替换, 持有这个 dict 的请求重试时直接用上新的 cookie
+        session.cookies.clear()
+        session.cookies.update(cookies)
+        session.generation = generation
+
+    async def relogin(self, session: Session, generation: int):
+        """log the session in again unless that already happened after `generation`, drops it when the login fails"""
+        if session.generation == generation:
+            await self.flight.do(session.token, lambda: self._relogin(session, generation))
+
+    async def _relogin(self, session: Session, generation: int):
+        row = self._db().execute('SELECT cookies, generation FROM sessions WHERE token = ?',
+                                 (session.token,)).fetchone()
+        if row is None:
+            self.sessions.pop(session.token, None)
+            raise HTTPException(status_code=401, detail='Session expired')
+        if row[1] != generation:
+            # 别的进程已经重新登录过
+            self._load(session, json.loads(row[0]), row[1])
+            return
+        status, cookies = await upstream_login(session.email, session.password)
+        if cookies is None:
+            self._forget(session.token)
+            logger.info('re-login failed with status %d, session dropped', status)
+            raise HTTPException(status_code=401, detail='Session expired')
+        updated = self._db().execute('UPDATE sessions SET cookies = ?, generation = ? WHERE token = ? AND generation = ?',
+                                     (json.dumps(cookies), generation + 1, session.token, generation)).rowcount
+        if not updated:
+            # 同时有别的进程也登录了, 以先写入的为准
+            row = self._db().execute('SELECT cookies, generation FROM sessions WHERE token = ?',
+                                     (session.token,)).fetchone()
+            if row is None:
+                raise HTTPException(status_code=401, detail='Session expired')
+            cookies, generation = json.loads(row[0]), row[1] - 1
+        self._load(session, cookies, generation + 1)
+        self.relogins += 1
+
+    def stats(self) -> dict:
+        return {
+            'sessions': self._db().execute('SELECT COUNT(*) FROM sessions').fetchone()[0],
+            'max_sessions': self.max_sessions,
+            'idle': self.idle,
+            'shared': bool(self.path),
+            'created': self.created,
+            'expired': self.expired,
+            'relogins': self.relogins,
+        }
+
+
+session_store = SessionStore(SESSION_PATH, SESSION_IDLE, SESSION_MAX)
@@ -0,0 +1,53 @@
+import asyncio
+from typing import Any, Awaitable, Callable
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task.
+
+    The shared task is shielded, so a caller that disconnects does not
+    cancel the fetch for everybody else waiting on it. Errors that `unshared`
+    accepts belong to the leader alone, followers then run their own `fn`.
+    """
+
+    def __init__(self):
+        self.calls: dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 unshared: Callable[[Exception], bool] | None = None) -> Any:
+        task = self.calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+            return await asyncio.shield(task)
+        self.followers += 1
+        try:
+            return await asyncio.shield(task)
+        except Exception as e:
+            if unshared is None or not unshared(e):
+                raise
+        # 例如领头请求的 cookie 已失效, 这个错误与自己无关, 用自己的参数再执行一次
+        return await fn()
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            # 所有调用方都已离开时, 避免 "exception was never retrieved"
+            task.exception()
+
+    def stats(self) -> dict:
+        calls = self.leaders + self.followers
+        return {
+            'in_flight': len(self.calls),
+            'leaders': self.leaders,
+            'coalesced': self.followers,
+            'coalesce_rate': round(self.followers / calls, 4) if calls else 0.0,
+        }
+
+
+upstream_flight = SingleFlight()
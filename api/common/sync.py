@@ -0,0 +1,208 @@
+"""Incremental sync of the local catalog from the newest-first listings.
+
+    python -m api.common.sync --categories new release --langs en cn
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Any, Callable
+
+from api.common import upstream
+from api.common.catalog import catalog
+from api.common.constants import (
+    SYNC_CONCURRENCY,
+    SYNC_INTERVAL,
+    SYNC_KNOWN_RUN,
+    SYNC_LANGS,
+    SYNC_MAX_PAGES,
+    SYNC_RATE,
+    UPSTREAM_BASE_URL,
+)
+from api.common.pasrer import (
+    parse_movie_detail,
+    parse_movie_list,
+    parse_uncensored_moives,
+    parse_url,
+)
+from api.common.util import fetch_page
+
+logger = logging.getLogger(__name__)
+
+# 与 movie.py 中对应路由相同的上游列表, 都是按时间倒序
+SYNC_CATEGORIES: dict[str, tuple[str, Callable[[Any], Any]]] = {
+    'new': ('/{lang}/new', parse_movie_list),
+    'release': ('/{lang}/release', parse_movie_list),
+    'uncensored-leak': ('/dm620/{lang}/uncensored-leak', parse_uncensored_moives),
+    'fc2': ('/dm97/{lang}/fc2', parse_movie_list),
+    'tokyohot': ('/dm29/{lang}/tokyohot', parse_movie_list),
+    '1pondo': ('/dm408463/{lang}/1pondo', parse_movie_list),
+    'caribbeancom': ('/dm584255/{lang}/caribbeancom', parse_movie_list),
+    'heyzo': ('/dm53663/{lang}/heyzo', parse_movie_list),
+}
+
+
+class RateLimiter:
+    """at most `rate` acquisitions per second, spaced evenly"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            now = time.monotonic()
+            if self.next_at > now:
+                await asyncio.sleep(self.next_at - now)
+            self.next_at = max(now, self.next_at) + self.interval
+
+
+class Syncer:
+    """Walk each listing from page 1 until the previous high-water mark or a run of
+    numbers whose details are already known, then fetch the details of the new ones.
+    """
+
+    def __init__(self, rate: float, concurrency: int, max_pages: int, known_run: int):
+        self.limiter = RateLimiter(rate)
+        self.concurrency = concurrency
+        self.max_pages = max_pages
+        self.known_run = known_run
+        self.task: asyncio.Task | None = None
+        self.running = False
+        self.last_run: dict = {}
+
+    async def fetch(self, lang: str, url: str, parser, params: dict | None = None):
+        await self.limiter.acquire()
+        return await fetch_page(lang, url, parser, params=params)
+
+    async def sync_category(self, category: str, lang: str) -> dict:
+        path, parser = SYNC_CATEGORIES[category]
+        url = parse_url(UPSTREAM_BASE_URL + path.format(lang=lang))
+        state = catalog.sync_state(category, lang) or {}
+        high_water = state.get('high_water')
+        # walked 是本次经过的编号, 从新到旧
+        walked, unseen, run, page, fetched = [], [], 0, 1, 0
+        stop = False
+        while not stop and page <= self.max_pages:
+            ret = await self.fetch(lang, url, parser, params={'page': page} if page > 1 else None)
+            fetched += 1
+            if not ret or not ret[2]:
+                break
+            numbers = [card.number.lower() for card in ret[2] if card.number]
+            known = catalog.detailed(lang, numbers)
+            for number in numbers:
+                if number == high_water:
+                    stop = True
+                    break
+                walked.append(number)
+                if number in known:
+                    run += 1
+                    if run >= self.known_run:
+                        stop = True
+                        break
+                else:
+                    run = 0
+                    if number not in unseen:
+                        unseen.append(number)
+            if page >= (ret[1] or 1):
+                break
+            page += 1
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_detail(number: str) -> bool:
+            async with semaphore:
+                try:
+                    detail_url = parse_url(f'{UPSTREAM_BASE_URL}/{lang}/{number}')
+                    return await self.fetch(lang, detail_url, parse_movie_detail) is not None
+                except Exception as e:
+                    logger.warning('sync detail %s/%s failed: %r', lang, number, e)
+                    return False
+
+        stored = await asyncio.gather(*(fetch_detail(number) for number in unseen))
+        failed = {number for number, ok in zip(unseen, stored) if not ok}
+        details = len(unseen) - len(failed)
+        catalog.record_sync(category, lang, self.high_water(walked, failed), fetched, details)
+        result = {'pages': fetched, 'new': len(unseen), 'details': details, 'failed': len(failed)}
+        logger.info('synced %s/%s: %s', category, lang, result)
+        return result
+
+    def high_water(self, walked: list[str], failed: set[str]) -> str | None:
+        """the newest walked number older than every failed detail, None keeps the previous mark
+
+        failed numbers stay above the mark, so the next sync walks past them and tries again
+        """
+        if not failed:
+            return walked[0] if walked else None
+        oldest_failed = max(i for i, number in enumerate(walked) if number in failed)
+        return walked[oldest_failed + 1] if oldest_failed + 1 < len(walked) else None
+
+    async def run_once(self, categories: list[str] | None = None, langs: list[str] | None = None) -> dict:
+        """sync every category and language once, a failing category does not stop the others"""
+        self.running = True
+        started = time.time()
+        results = {}
+        try:
+            for lang in langs or SYNC_LANGS:
+                for category in categories or SYNC_CATEGORIES:
+                    try:
+                        results[f'{category}/{lang}'] = await self.sync_category(category, lang)
+                    except Exception as e:
+                        logger.exception('sync %s/%s failed', category, lang)
+                        results[f'{category}/{lang}'] = {'error': repr(e)}
+        finally:
+            self.running = False
+        self.last_run = {'started_at': started, 'elapsed': time.time() - started, 'results': results}
+        return results
+
+    async def _schedule(self, interval: int):
+        while True:
+            await self.run_once()
+            await asyncio.sleep(interval)
+
+    def start(self, interval: int = SYNC_INTERVAL):
+        """run a sync every `interval` seconds in the background, 0 turns the scheduler off"""
+        if interval > 0 and catalog.enabled and self.task is None:
+            self.task = asyncio.create_task(self._schedule(interval))
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def stats(self) -> dict:
+        return {'scheduled': self.task is not None, 'running': self.running, 'last_run': self.last_run}
+
+
+syncer = Syncer(SYNC_RATE, SYNC_CONCURRENCY, SYNC_MAX_PAGES, SYNC_KNOWN_RUN)
+
+
+async def main(categories: list[str], langs: list[str], max_pages: int):
+    syncer.max_pages = max_pages
+    await upstream.startup()
+    catalog.start()
+    try:
+        return await syncer.run_once(categories, langs)
+    finally:
+        await upstream.shutdown()
+        catalog.stop()
+
+
+if __name__ == '__main__':
+    from api.common.logging import setup_logging
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--categories', nargs='+', choices=list(SYNC_CATEGORIES), default=list(SYNC_CATEGORIES))
+    parser.add_argument('--langs', nargs='+', default=SYNC_LANGS)
+    parser.add_argument('--max-pages', type=int, default=SYNC_MAX_PAGES)
+    args = parser.parse_args()
+
+    setup_logging()
+    for name, result in asyncio.run(main(args.categories, args.langs, args.max_pages)).items():
+        print(f'{name:<24} {result}')
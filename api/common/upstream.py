@@ -0,0 +1,166 @@
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from http.cookiejar import CookieJar, DefaultCookiePolicy
+from typing import AsyncIterator
+
+import httpx
+
+from api.common.constants import (
+    HEADERS,
+    UPSTREAM_HTTP2,
+    UPSTREAM_KEEPALIVE_EXPIRY,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE,
+    UPSTREAM_TIMEOUT,
+)
+from api.common.governor import governor
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_client: httpx.AsyncClient | None = None
+_transport: httpx.AsyncHTTPTransport | None = None
+_counters = Counter()
+
+
+class _NoCookiePolicy(DefaultCookiePolicy):
+    """The client is shared by every user, so it must never remember cookies."""
+
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+def _create_client() -> httpx.AsyncClient:
+    global _transport
+    http2 = UPSTREAM_HTTP2 and HTTP2_AVAILABLE
+    if UPSTREAM_HTTP2 and not HTTP2_AVAILABLE:
+        logger.warning('HTTP/2 requested but the h2 package is missing, using HTTP/1.1')
+    _transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        verify=False,
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive_connections=UPSTREAM_MAX_KEEPALIVE,
+            keepalive_expiry=UPSTREAM_KEEPALIVE_EXPIRY))
+    return httpx.AsyncClient(
+        headers=HEADERS,
+        cookies=CookieJar(policy=_NoCookiePolicy()),
+        timeout=UPSTREAM_TIMEOUT,
+        follow_redirects=True,
+        transport=_transport)
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = _create_client()
+    return _client
+
+
+async def startup():
+    get_client()
+    logger.info('upstream pool started: %s', stats())
+
+
+async def shutdown():
+    global _client, _transport
+    if _client is not None:
+        await _client.aclose()
+    _client = None
+    _transport = None
+
+
+def stats() -> dict:
+    connections = getattr(getattr(_transport, '_pool', None), 'connections', [])
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {
+        'http2': UPSTREAM_HTTP2 and HTTP2_AVAILABLE,
+        'max_connections': UPSTREAM_MAX_CONNECTIONS,
+        'max_keepalive': UPSTREAM_MAX_KEEPALIVE,
+        'keepalive_expiry': UPSTREAM_KEEPALIVE_EXPIRY,
+        'in_use': len(connections) - idle,
+        'idle': idle,
+        'created': _counters['created'],
+        'reused': _counters['reused'],
+        'requests': _counters['requests'],
+        'in_flight': _counters['in_flight'],
+    }
+
+
+def in_flight() -> int:
+    """upstream requests currently waiting for a response or streaming a body"""
+    return _counters['in_flight']
+
+
+def cookie_header(cookies: dict | None) -> dict:
+    if not cookies:
+        return {}
+    return {'Cookie': '; '.join(f'{key}={value}' for key, value in cookies.items())}
+
+
+class _ConnectionTrace:
+    """httpcore trace hook telling whether a call opened a new connection or reused a pooled one"""
+
+    def __init__(self):
+        self.connected = 0
+        _counters['requests'] += 1
+        _counters['in_flight'] += 1
+
+    async def __call__(self, event_name: str, info: dict):
+        if event_name == 'connection.connect_tcp.complete':
+            self.connected += 1
+
+    def record(self):
+        _counters['in_flight'] -= 1
+        # 重定向时一次调用可能经过多个连接
+        _counters['created'] += self.connected
+        _counters['reused'] += 0 if self.connected else 1
+
+
+async def request(method: str, url: str, cookies: dict | None = None, **kwargs) -> httpx.Response:
+    """every upstream call waits for its turn in the governor, see `api.common.governor`"""
+    async with governor.slot(url, cookies):
+        trace = _ConnectionTrace()
+        try:
+            response = await get_client().request(
+                method, url, headers=cookie_header(cookies), extensions={'trace': trace}, **kwargs)
+        finally:
+            trace.record()
+        governor.observe(url, response)
+        return response
+
+
+@asynccontextmanager
+async def stream(method: str, url: str, cookies: dict | None = None, **kwargs) -> AsyncIterator[httpx.Response]:
+    """like `request`, but the body is read incrementally; leaving the block closes the stream"""
+    async with governor.slot(url, cookies):
+        trace = _ConnectionTrace()
+        try:
+            async with get_client().stream(
+                    method, url, headers=cookie_header(cookies), extensions={'trace': trace}, **kwargs) as response:
+                governor.observe(url, response)
+                yield response
+        finally:
+            trace.record()
+
+
+async def get(url: str, cookies: dict | None = None, params: dict | None = None) -> httpx.Response:
+    return await request('GET', url, cookies=cookies, params=params)
+
+
+async def post(url: str, cookies: dict | None = None, data: dict | None = None,
+               json: dict | None = None) -> httpx.Response:
+    return await request('POST', url, cookies=cookies, data=data, json=json)
+
+
+async def delete(url: str, cookies: dict | None = None) -> httpx.Response:
+    return await request('DELETE', url, cookies=cookies)
@@ -1,12 +1,35 @@
+import asyncio
 import logging
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable
 
-import requests
-from fastapi import Request
-from lxml import html
+import httpx
+import orjson
+from fastapi import HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 
-from api.common.constants import HEADERS
-from api.common.pasrer import parse_login, parse_movie_list
-from api.domain.model import BaseResponse, PageResult
+from api.common import upstream
+from api.common.cache import Entry, cache_key, encode_payload, payload_etag, response_cache
+from api.common.capture import ERRORS, PARSE_FAILURES, SAMPLE, response_capture
+from api.common.catalog import catalog
+from api.common.constants import (
+    BATCH_CONCURRENCY,
+    CACHE_STALE_IF_ERROR,
+    CACHE_STALE_REVALIDATE,
+    CACHE_TTL_LISTING,
+    CAPTURE_TAIL_BYTES,
+    CRAWL_PREFETCH,
+)
+from api.common.governor import UpstreamBusy, retry_after, throttled
+from api.common.pasrer import (
+    STREAM_PARSERS,
+    parse_html,
+    parse_login,
+    parse_movie_list,
+)
+from api.common.session import session_store
+from api.common.singleflight import upstream_flight
+from api.domain.listing import Listing
 
 logger = logging.getLogger(__name__)
 
@@ -16,15 +39,372 @@ def param_handler(raw_params: dict) -> dict:
             None, ""]}
 
 
-def movie_get(request: Request, cookies: dict, url: str) -> BaseResponse:
-    response = requests.get(
-        url=url,
-        cookies=cookies,
-        params=param_handler(request.query_params),
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_movie_list(tree)
-        return BaseResponse(data=PageResult(current_page=request.query_params.get('page'), page_size=ret[0], page_count=ret[1], data=ret[2]))
+def _raise_if_throttled(response: httpx.Response):
+    """a throttled fetch is a 503 the client can retry, not an empty result"""
+    if throttled(response):
+        raise UpstreamBusy(retry_after(response) or 1)
+
+
+async def _stream_and_parse(url: str, cookies: dict, params: dict | None, feed_factory,
+                            check_login: bool = True) -> Any:
+    sampled = response_capture.sampled()
+    # 抽样时留存 body 开头; 否则只保留最近的一段, 解析失败时留存失败处附近的内容
+    tail = None if sampled or not response_capture.wants(PARSE_FAILURES) else deque()
+    async with upstream.stream('GET', url, cookies=cookies, params=params) as response:
+        if response.status_code != 200:
+            if response_capture.wants(ERRORS):
+                response_capture.record(ERRORS, str(response.url), response.status_code, await response.aread())
+            _raise_if_throttled(response)
+            return None
+        feed = feed_factory(response.charset_encoding, check_login)
+        chunks, kept = [], 0
+        try:
+            async for chunk in response.aiter_bytes():
+                if sampled and kept < response_capture.max_bytes:
+                    chunks.append(chunk)
+                    kept += len(chunk)
+                elif tail is not None:
+                    tail.append(chunk)
+                    kept += len(chunk)
+                    while kept - len(tail[0]) >= CAPTURE_TAIL_BYTES:
+                        kept -= len(tail.popleft())
+                feed.feed(chunk)
+                if feed.done:
+                    # 需要的内容已经解析完, 直接关闭连接, 不再读取剩余的 body
+                    break
+            ret = feed.close()
+        except HTTPException:
+            raise
+        except Exception as e:
+            if response_capture.wants(PARSE_FAILURES):
+                body = b''.join(chunks if tail is None else tail)
+                error = repr(e) if tail is None else f'{e!r} (last {len(body)} bytes of the body)'
+                response_capture.record(PARSE_FAILURES, str(response.url), response.status_code, body, error)
+            raise
+        if sampled:
+            response_capture.record(SAMPLE, str(response.url), response.status_code, b''.join(chunks))
+    return ret
+
+
+async def _fetch_and_parse(key: str, lang: str, url: str, cookies: dict, parser: Callable[[Any], Any],
+                           ttl: int, params: dict | None, check_login: bool = True) -> Any:
+    """fetch, parse, cache and record a page, `check_login` turns a logged out page into 401"""
+    feed_factory = STREAM_PARSERS.get(parser)
+    if feed_factory is not None:
+        ret = await _stream_and_parse(url, cookies, params, feed_factory, check_login)
+    else:
+        response = await upstream.get(url=url, cookies=cookies, params=params)
+        if response.status_code != 200:
+            if response_capture.wants(ERRORS):
+                response_capture.record(ERRORS, str(response.url), response.status_code, response.content)
+            _raise_if_throttled(response)
+            return None
+        try:
+            tree = parse_html(response.text)
+            if check_login:
+                parse_login(tree)
+            ret = parser(tree)
+        except HTTPException:
+            raise
+        except Exception as e:
+            if response_capture.wants(PARSE_FAILURES):
+                response_capture.record(PARSE_FAILURES, str(response.url), response.status_code, response.content, repr(e))
+            raise
+        if response_capture.sampled():
+            response_capture.record(SAMPLE, str(response.url), response.status_code, response.content)
+    if ret is not None:
+        response_cache.set(key, ret, ttl)
+        catalog.record(lang, parser, ret)
+    return ret
+
+
+async def fetch_page(lang: str, url: str, parser: Callable[[Any], Any], ttl: int = 0,
+                     params: dict | None = None) -> Any:
+    """fetch and parse a public page outside of a request, for background jobs
+
+    the result is cached for `ttl` seconds and recorded in the catalog like any other fetch.
+    The fetch is anonymous, so the login button on the page is expected and not a 401
+    """
+    key = cache_key(lang, url, params, parser.__name__)
+    return await _fetch_and_parse(key, lang, url, {}, parser, ttl, params, check_login=False)
+
+
+async def fetch_parsed(request: Request, cookies: dict, url: str, parser: Callable[[Any], Any],
+                       ttl: int, params: dict | None = None, coalesce: bool = True) -> Any:
+    """fetch an upstream page and parse it, parsed results of public pages are cached for `ttl` seconds
+
+    concurrent requests for the same public page share one upstream fetch and parse,
+    unless `coalesce` is off so that cancelling the caller also cancels the fetch.
+    A recently expired result is returned at once and refreshed in the background,
+    an older one is returned when upstream fails.
+    When upstream logged out the session behind a token, it logs in again and retries once
+    """
+    ret, entry, max_age = await _fetch_with_session(request, cookies, url, parser, ttl, params, coalesce)
+    if ret is not None:
+        record_payload(request, ret, max_age, entry)
+    return ret
+
+
+async def fetch_payload(request: Request, cookies: dict, url: str, parser: Callable[[Any], Any],
+                        ttl: int, params: dict | None = None) -> tuple[Any, bytes | None]:
+    """fetch_parsed plus the encoded JSON of the result, taken from the cache entry when there is one"""
+    ret, entry, max_age = await _fetch_with_session(request, cookies, url, parser, ttl, params, True)
+    if ret is None:
+        return None, None
+    encoded = entry.encoded if entry is not None else encode_payload(ret)
+    record_payload(request, ret, max_age, entry, encoded)
+    return ret, encoded
+
+
+async def _fetch_with_session(request: Request, cookies: dict, url: str, parser: Callable[[Any], Any],
+                              ttl: int, params: dict | None, coalesce: bool) -> tuple[Any, Entry | None, float]:
+    session = getattr(request.state, 'session', None)
+    generation = session.generation if session is not None else 0
+    try:
+        return await _fetch_parsed(request, cookies, url, parser, ttl, params, coalesce)
+    except HTTPException as e:
+        if e.status_code != 401 or session is None:
+            raise
+    # 会话里的 cookies 和 `cookies` 是同一个 dict, 重新登录后原地更新
+    await session_store.relogin(session, generation)
+    return await _fetch_parsed(request, cookies, url, parser, ttl, params, coalesce)
+
+
+async def _fetch_parsed(request: Request, cookies: dict, url: str, parser: Callable[[Any], Any],
+                        ttl: int, params: dict | None, coalesce: bool) -> tuple[Any, Entry | None, float]:
+    """(result, its cache entry if any, seconds it stays fresh)"""
+    lang = request.state.lang
+    key = cache_key(lang, url, params, parser.__name__)
+    if ttl <= 0:
+        return await _fetch_and_parse(key, lang, url, cookies, parser, ttl, params), None, 0
+    entry = response_cache.lookup(key)
+    stale = None
+    if entry is not None:
+        expired_for = entry.expired_for()
+        if expired_for < 0:
+            return entry.value, entry, -expired_for
+        if expired_for < CACHE_STALE_REVALIDATE:
+            _revalidate(key, lambda: _fetch_and_parse(key, lang, url, cookies, parser, ttl, params))
+            _mark_stale(request, entry, 'stale')
+            return entry.value, entry, 0
+        if expired_for < CACHE_STALE_IF_ERROR:
+            stale = entry
+    try:
+        if not coalesce:
+            ret = await _fetch_and_parse(key, lang, url, cookies, parser, ttl, params)
+        else:
+            ret = await upstream_flight.do(
+                key, lambda: _fetch_and_parse(key, lang, url, cookies, parser, ttl, params),
+                unshared=_unauthorized)
+    except httpx.HTTPError as e:
+        if stale is None:
+            logger.warning('upstream request %s failed: %r', url, e)
+            raise HTTPException(status_code=502, detail='Upstream request failed')
+        ret = None
+    except UpstreamBusy:
+        if stale is None:
+            raise
+        ret = None
+    if ret is None and stale is not None:
+        _mark_stale(request, stale, 'stale-if-error')
+        return stale.value, stale, 0
+    entry = response_cache.peek(key) if ret is not None else None
+    if entry is not None and entry.value is ret:
+        return ret, entry, ttl
+    return ret, None, 0
+
+
+def record_payload(request: Request, value: Any, max_age: float, entry: Entry | None = None,
+                   encoded: bytes | None = None):
+    """remember the ETag and freshness of one payload used to build the response
+
+    the middleware turns them into ETag / Cache-Control headers and answers If-None-Match,
+    streaming responses have no validators and nothing is recorded
+    """
+    validators = request.state.validators
+    if validators is not None:
+        etag = entry.etag() if entry is not None else payload_etag(value, encoded)
+        validators.append((etag, int(max_age)))
+
+
+# BaseResponse 成功时的外层, data 部分直接拼入已编码的 JSON
+_ENVELOPE = b'{"code":0,"success":true,"message":"ok","data":%s}'
+
+
+def data_response(data: Any, encoded: bytes | None = None) -> Response:
+    """BaseResponse(data=data) as JSON, `encoded` is the JSON of `data` when the caller already has it"""
+    return Response(_ENVELOPE % (encode_payload(data) if encoded is None else encoded),
+                    media_type='application/json')
+
+
+def page_response(current_page: int, ret: tuple, encoded: bytes | None = None) -> Response:
+    """BaseResponse(data=PageResult(...)) for a (page_size, page_count, data) payload"""
+    page = b'{"current_page":%s,"page_size":%s,"page_count":%s,"data":%s}' % (
+        orjson.dumps(current_page), orjson.dumps(ret[0]), orjson.dumps(ret[1]),
+        encode_payload(ret) if encoded is None else encoded)
+    return Response(_ENVELOPE % page, media_type='application/json')
+
+
+def _unauthorized(e: Exception) -> bool:
+    """a 401 / login page is about the cookies of whoever fetched, not about the page"""
+    return isinstance(e, HTTPException) and e.status_code == 401
+
+
+def _revalidate(key: str, fn: Callable[[], Awaitable[Any]]):
+    """refresh a stale entry without waiting, a failed refresh keeps the stale entry"""
+    def done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning('revalidating %s failed: %r', key, task.exception())
+
+    asyncio.ensure_future(upstream_flight.do(key, fn)).add_done_callback(done)
+
+
+def _mark_stale(request: Request, entry: Entry, status: str):
+    """tell the client how old the data is, the middleware copies these headers to the response"""
+    headers = request.state.response_headers
+    headers['Age'] = str(max(entry.age(), int(headers.get('Age', 0))))
+    headers['X-Cache'] = status
+
+
+async def movie_get(request: Request, cookies: dict, url: str,
+                    parser: Callable[[Any], Any] = parse_movie_list,
+                    ttl: int = CACHE_TTL_LISTING,
+                    listing: Listing | None = None) -> Response:
+    params = param_handler(request.query_params)
+    for name in ('pages', 'stream', 'cursor'):
+        params.pop(name, None)
+    if listing is not None and listing.stream is not None:
+        return await movie_stream(request, cookies, url, parser, ttl, params, listing)
+    if listing is not None and listing.pages is not None:
+        return await movie_range(request, cookies, url, parser, ttl, params, *listing.pages)
+    ret, encoded = await fetch_payload(request, cookies, url, parser, ttl, params=params)
+    if ret is not None:
+        return page_response(int(request.query_params.get('page', 1)), ret, encoded)
+
+
+async def movie_range(request: Request, cookies: dict, url: str, parser: Callable[[Any], Any],
+                      ttl: int, params: dict, first: int, last: int) -> Response:
+    """fetch pages first..last concurrently and merge them in page order, deduped by number
+
+    the first page is fetched alone so its page_count can clamp the range
+    """
+    async def fetch_page(page: int):
+        return await fetch_parsed(request, cookies, url, parser, ttl, params={**params, 'page': page})
+
+    head = await fetch_page(first)
+    if head is None:
+        return None
+    last = min(last, max(head[1] or first, first))
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def bounded(page: int):
+        async with semaphore:
+            return await fetch_page(page)
+
+    rest = await asyncio.gather(*(bounded(page) for page in range(first + 1, last + 1)))
+    seen, data = set(), []
+    for ret in (head, *rest):
+        if ret is None:
+            continue
+        for movie in ret[2]:
+            if movie.number in seen:
+                continue
+            seen.add(movie.number)
+            data.append(movie)
+    return page_response(first, (len(data), head[1], data))
+
+
+async def movie_stream(request: Request, cookies: dict, url: str, parser: Callable[[Any], Any],
+                       ttl: int, params: dict, listing: Listing) -> StreamingResponse:
+    """walk every page of a listing and stream each movie as soon as its page is parsed
+
+    the first page is fetched before responding, so auth and upstream errors still get a status code
+    """
+    first = listing.cursor or (listing.pages[0] if listing.pages else int(request.query_params.get('page', 1)))
+    # 流式响应没有可以比较的整体内容, 不生成 ETag
+    request.state.validators = None
+
+    async def fetch_page(page: int):
+        return await fetch_parsed(request, cookies, url, parser, ttl,
+                                  params={**params, 'page': page}, coalesce=False)
+
+    head = await fetch_page(first)
+    if head is None:
+        return None
+    last = max(head[1] or first, first)
+    if listing.pages is not None:
+        last = min(last, listing.pages[1])
+    encode = _sse_event if listing.stream == 'sse' else _ndjson_line
+    media_type = 'text/event-stream' if listing.stream == 'sse' else 'application/x-ndjson'
+
+    async def body() -> AsyncIterator[bytes]:
+        async for page, ret, error in crawl(fetch_page, head, first, last):
+            if error is not None:
+                yield encode('error', page, {"page": page, "error": error})
+                return
+            for movie in ret[2]:
+                yield encode('movie', None, {"page": page, "data": movie})
+            # id 是下一页, 客户端断开后用它作为 cursor / Last-Event-ID 续传
+            yield encode('page', page + 1, {"page": page, "page_count": head[1]})
+
+    return StreamingResponse(body(), media_type=media_type)
+
+
+async def crawl(fetch_page: Callable[[int], Awaitable[Any]], head: Any, first: int, last: int):
+    """yield (page, result, error) in page order while keeping up to CRAWL_PREFETCH pages in flight
+
+    only the prefetch window is held in memory, pending fetches are cancelled when the consumer goes away
+    """
+    yield first, head, None
+    pending: deque[tuple[int, asyncio.Task]] = deque()
+    next_page = first + 1
+    try:
+        while pending or next_page <= last:
+            while len(pending) < CRAWL_PREFETCH and next_page <= last:
+                pending.append((next_page, asyncio.ensure_future(fetch_page(next_page))))
+                next_page += 1
+            page, task = pending.popleft()
+            try:
+                ret = await task
+            except HTTPException as e:
+                yield page, None, e.detail
+                return
+            if ret is None:
+                yield page, None, "upstream request failed"
+                return
+            if not ret[2]:
+                return
+            yield page, ret, None
+    finally:
+        for _, task in pending:
+            if not task.cancel() and not task.cancelled():
+                task.exception()
+
+
+def _ndjson_line(event: str, id: int | None, data: dict) -> bytes:
+    return orjson.dumps({"event": event, **data}) + b'\n'
+
+
+def _sse_event(event: str, id: int | None, data: dict) -> bytes:
+    head = b'event: %s\n' % event.encode() if id is None else b'event: %s\nid: %d\n' % (event.encode(), id)
+    return b'%sdata: %s\n\n' % (head, orjson.dumps(data))
+
+
+async def fan_out(items: list, fn: Callable[[Any], Awaitable[Any]], concurrency: int) -> list[dict]:
+    """run `fn` over items with at most `concurrency` in flight, errors are reported per item"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item):
+        async with semaphore:
+            try:
+                data = await fn(item)
+            except HTTPException as e:
+                return {"data": None, "error": e.detail}
+            except Exception as e:
+                logger.warning('fan out item %s failed: %r', item, e)
+                return {"data": None, "error": repr(e)}
+        if data is None:
+            return {"data": None, "error": "upstream request failed"}
+        return {"data": data, "error": None}
+
+    return await asyncio.gather(*(run(item) for item in items))
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from api.common import upstream
+from api.common.cache import cache_key, response_cache
+from api.common.constants import (
+    CACHE_TTL_HOT,
+    CACHE_TTL_INDEX,
+    CACHE_TTL_LISTING,
+    CACHE_TTL_RANKING,
+    UPSTREAM_BASE_URL,
+    WARM,
+    WARM_BUSY,
+    WARM_CONCURRENCY,
+    WARM_LANGS,
+    WARM_LEAD,
+    WARM_TARGETS,
+)
+from api.common.pasrer import (
+    parse_actress_ranking,
+    parse_movie_genres,
+    parse_movie_list,
+    parse_url,
+)
+from api.common.util import fetch_page
+
+logger = logging.getLogger(__name__)
+
+# 预热的页面, url 和解析器与对应路由一致, 这样缓存 key 相同
+TARGETS: dict[str, tuple[str, Callable[[Any], Any], int]] = {
+    'hot/today': ('/dm291/{lang}/today-hot', parse_movie_list, CACHE_TTL_HOT),
+    'hot/weekly': ('/dm169/{lang}/weekly-hot', parse_movie_list, CACHE_TTL_HOT),
+    'hot/monthly': ('/dm256/{lang}/monthly-hot', parse_movie_list, CACHE_TTL_HOT),
+    'new': ('/{lang}/new', parse_movie_list, CACHE_TTL_LISTING),
+    'release': ('/{lang}/release', parse_movie_list, CACHE_TTL_LISTING),
+    'actress/ranking': ('/{lang}/actresses/ranking', parse_actress_ranking, CACHE_TTL_RANKING),
+    'genres': ('/{lang}/genres?page=1', parse_movie_genres, CACHE_TTL_INDEX),
+    'makers': ('/{lang}/makers?page=1', parse_movie_genres, CACHE_TTL_INDEX),
+}
+
+
+@dataclass
+class WarmKey:
+    name: str
+    lang: str
+    url: str
+    parser: Callable[[Any], Any]
+    ttl: int
+    key: str
+    # 刷新失败或没被缓存接纳时, 到这个时间之前不再重试
+    not_before: float = 0.0
+
+
+class Warmer:
+    """Refresh declared cache entries shortly before they expire.
+
+    Refreshes run with bounded concurrency and wait, up to half of `lead`,
+    while interactive requests keep more than `busy` upstream calls in flight.
+    """
+
+    def __init__(self, names: list[str], langs: list[str], lead: int, concurrency: int, busy: int):
+        self.lead = max(lead, 1)
+        self.busy = busy
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.keys = []
+        for lang in langs:
+            for name in names or TARGETS:
+                path, parser, ttl = TARGETS[name]
+                url = parse_url(UPSTREAM_BASE_URL + path.format(lang=lang))
+                self.keys.append(WarmKey(name, lang, url, parser, ttl, cache_key(lang, url, None, parser.__name__)))
+        self.task: asyncio.Task | None = None
+        self.active = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.deferred = 0
+
+    def due_in(self, key: WarmKey) -> float:
+        left = response_cache.ttl_left(key.key)
+        due = 0.0 if left is None else left - self.lead
+        return max(due, key.not_before - time.monotonic())
+
+    async def _yield_to_users(self):
+        deadline = time.monotonic() + self.lead / 2
+        if upstream.in_flight() - self.active >= self.busy:
+            self.deferred += 1
+        while upstream.in_flight() - self.active >= self.busy and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+
+    async def refresh(self, key: WarmKey):
+        async with self.semaphore:
+            await self._yield_to_users()
+            key.not_before = time.monotonic() + self.lead
+            self.active += 1
+            try:
+                ret = await fetch_page(key.lang, key.url, key.parser, key.ttl)
+            except Exception as e:
+                ret = None
+                logger.warning('warming %s/%s failed: %r', key.name, key.lang, e)
+            finally:
+                self.active -= 1
+        if ret is None:
+            self.failed += 1
+        else:
+            self.refreshed += 1
+
+    async def _run(self):
+        while True:
+            due = [key for key in self.keys if self.due_in(key) <= 0]
+            if due:
+                await asyncio.gather(*(self.refresh(key) for key in due))
+            await asyncio.sleep(max(min(self.due_in(key) for key in self.keys), 1))
+
+    def start(self):
+        if self.keys and self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+
+    def stats(self) -> dict:
+        return {
+            'running': self.task is not None,
+            'keys': len(self.keys),
+            'refreshed': self.refreshed,
+            'failed': self.failed,
+            'deferred': self.deferred,
+        }
+
+
+warmer = Warmer(WARM_TARGETS, WARM_LANGS if WARM else [], WARM_LEAD, WARM_CONCURRENCY, WARM_BUSY)
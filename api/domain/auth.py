@@ -1,16 +1,27 @@
 from http.cookies import SimpleCookie
 from typing import Annotated
 
-from fastapi import Depends, Header, HTTPException
+from fastapi import Depends, Header, HTTPException, Request
+
+from api.common.session import session_store
 
 
 async def get_auth_key(
+    request: Request,
     auth_key: Annotated[str | None, Header()] = None
 ):
+    request.state.session = None
     if not auth_key:
         raise HTTPException(status_code=401, detail='Unauthorized')
+    if '=' not in auth_key:
+        # login 返回的会话 token, 会话里保存着上游 cookie
+        session = session_store.get(auth_key)
+        if session is None:
+            raise HTTPException(status_code=401, detail='Session expired')
+        request.state.session = session
+        return session.cookies
     try:
-        # 解析 cookie 字符串
+        # 兼容直接传 cookie 字符串
         cookie = SimpleCookie(auth_key)
         cookie_dict = {key: morsel.value for key, morsel in cookie.items()}
         return cookie_dict
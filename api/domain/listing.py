@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from typing import Annotated, Literal
+
+from fastapi import Depends, Header, HTTPException, Query
+
+from api.common.constants import LISTING_MAX_PAGES
+
+
+@dataclass
+class Listing:
+    # 闭区间 (first, last), None 表示只取 page 参数指定的那一页
+    pages: tuple[int, int] | None = None
+    # ndjson | sse, None 表示普通的 json 响应
+    stream: str | None = None
+    # 流式抓取从这一页开始, 用于断点续传
+    cursor: int | None = None
+
+
+def _page_range(pages: str | None) -> tuple[int, int] | None:
+    if not pages:
+        return None
+    first, sep, last = pages.partition('-')
+    try:
+        first = int(first)
+        last = int(last) if sep else first
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid page range')
+    if first < 1 or last < first:
+        raise HTTPException(status_code=400, detail='Invalid page range')
+    return first, last
+
+
+async def get_listing(
+    pages: Annotated[str | None, Query(...,
+                                       title="page range",
+                                       description=f"fetch a range of pages at once and merge them, e.g. 1-10, at most {LISTING_MAX_PAGES} pages unless streamed")] = None,
+    stream: Annotated[Literal['ndjson', 'sse'] | None, Query(...,
+                                                             title="stream",
+                                                             description="walk every page and stream each movie as NDJSON lines or server-sent events")] = None,
+    cursor: Annotated[int | None, Query(...,
+                                        title="cursor",
+                                        description="page to resume a stream from", ge=1)] = None,
+    last_event_id: Annotated[str | None, Header()] = None
+):
+    page_range = _page_range(pages)
+    if stream is None:
+        if page_range is not None and page_range[1] - page_range[0] + 1 > LISTING_MAX_PAGES:
+            raise HTTPException(status_code=400, detail=f'At most {LISTING_MAX_PAGES} pages per request')
+        return Listing(pages=page_range)
+    # EventSource 重连时会带上最后收到的 id
+    if cursor is None and last_event_id and last_event_id.isdigit():
+        cursor = int(last_event_id)
+    return Listing(pages=page_range, stream=stream, cursor=cursor)
+
+ListingDepend = Annotated[Listing, Depends(get_listing)]
@@ -1,8 +1,22 @@
 
-from typing import Any
+from typing import Generic, TypeVar
 
 from pydantic import BaseModel, Field
 
+from api.domain.record import (
+    Actress,
+    ActressRank,
+    Genre,
+    MovieCard,
+    MovieDetail,
+    MovieMeta,
+    MovieSearch,
+    Playlist,
+    PlaylistMovieCard,
+)
+
+T = TypeVar('T')
+
 
 class UserInfo(BaseModel):
     email: str = Field(..., example="xxx@gmail.com", description="email")
@@ -16,18 +30,71 @@ class PlaylistInput(BaseModel):
     scope: int = 0
 
 
-class PageResult(BaseModel):
+class BatchInput(BaseModel):
+    numbers: list[str] = Field(..., example=["ssis-001", "ipx-803"],
+                               description="movie numbers")
+
+
+class PageResult(BaseModel, Generic[T]):
     current_page: int = Field(..., example=1,
                               description="currentm page index")
     page_size: int = Field(..., example=12,
                            description="number of entries per page")
     page_count: int = Field(..., example=12,
                             description="total number of pages")
-    data: Any = Field(..., example=[], description="data list")
+    data: T = Field(..., example=[], description="data list")
 
 
-class BaseResponse(BaseModel):
+class BaseResponse(BaseModel, Generic[T]):
     code: int = 0
     success: bool = True
     message: str = "ok"
-    data: Any = None
+    data: T | None = None
+
+
+class BatchItem(BaseModel):
+    number: str
+    data: MovieDetail | MovieMeta | None = None
+    error: str | None = None
+
+
+class CatalogMovie(BaseModel):
+    """a movie row of the local catalog, fields it has not seen yet are left out"""
+    number: str
+    title: str | None = None
+    link: str | None = None
+    cover: str | None = None
+    preview: str | None = None
+    duration: str | None = None
+    description: str | None = None
+    jp_title: str | None = None
+    release_date: str | None = None
+    actress: str | None = None
+    genres: str | None = None
+    series: str | None = None
+    maker: str | None = None
+    director: str | None = None
+    tags: str | None = None
+
+
+class CatalogActress(BaseModel):
+    name: str
+
+
+class LocalSearch(BaseModel):
+    actress: list[CatalogActress] = []
+    moives: list[CatalogMovie] = []
+
+
+# 路由的响应 schema, 处理函数直接返回编码好的 JSON, 这些只用于 OpenAPI 文档
+MovieResponse = BaseResponse[MovieDetail | MovieMeta]
+BatchResponse = BaseResponse[list[BatchItem]]
+MoviePageResponse = BaseResponse[PageResult[list[MovieCard]]]
+MovieSearchResponse = BaseResponse[PageResult[MovieSearch]]
+LocalSearchResponse = BaseResponse[PageResult[LocalSearch]]
+CatalogPageResponse = BaseResponse[PageResult[list[CatalogMovie]]]
+ActressPageResponse = BaseResponse[PageResult[list[Actress]]]
+ActressRankingResponse = BaseResponse[list[ActressRank]]
+GenrePageResponse = BaseResponse[PageResult[list[Genre]]]
+PlaylistPageResponse = BaseResponse[PageResult[list[Playlist]]]
+PlaylistDetailResponse = BaseResponse[PageResult[list[PlaylistMovieCard]]]
@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field
+
+
+# 解析器直接产出的记录: slots 没有每个实例的 __dict__, 比同样字段的 dict 小得多,
+# orjson 可以直接编码, pydantic 用它们生成 OpenAPI schema
+@dataclass(slots=True)
+class MovieCard:
+    title: str
+    link: str
+    number: str
+    cover: str
+    preview: str
+    duration: str
+    is_subtitle: bool = False
+    subtitle: str | None = None
+
+
+@dataclass(slots=True)
+class PlaylistMovieCard(MovieCard):
+    comment: str | None = None
+
+
+@dataclass(slots=True)
+class MovieMeta:
+    title: str = ''
+    link: str = ''
+    description: str = ''
+    cover: str = ''
+
+
+@dataclass(slots=True)
+class MovieDetail(MovieMeta):
+    release_date: str = ''
+    number: str = ''
+    jp_title: str = ''
+    # 部分影片的详情页没有这些行
+    actress: str | None = None
+    genres: str | None = None
+    series: str | None = None
+    maker: str | None = None
+    director: str | None = None
+    tags: str | None = None
+
+
+@dataclass(slots=True)
+class Actress:
+    name: str
+    link: str
+    videos: int
+    cover: str
+    debut: str | None = None
+
+
+@dataclass(slots=True)
+class ActressRank:
+    name: str
+    link: str
+    rank: str
+    cover: str
+
+
+@dataclass(slots=True)
+class Playlist:
+    name: str
+    key: str
+    link: str
+    scope: str
+    owner: str
+    updated_at: str
+
+
+@dataclass(slots=True)
+class Genre:
+    """a genre or a maker"""
+    name: str
+    link: str
+    count: int
+
+
+@dataclass(slots=True)
+class MovieSearch:
+    actress: list[Actress] = field(default_factory=list)
+    moives: list[MovieCard] = field(default_factory=list)
@@ -1,14 +1,40 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
+from api.common import upstream
+from api.common.capture import response_capture
+from api.common.catalog import catalog
 from api.common.logging import setup_logging
 from api.common.middleware import register_middlewares
+from api.common.session import session_store
+from api.common.sync import syncer
+from api.common.warmer import warmer
 from api.v1 import router as v1_router
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await upstream.startup()
+    response_capture.start()
+    catalog.start()
+    syncer.start()
+    warmer.start()
+    yield
+    await warmer.stop()
+    await syncer.stop()
+    await upstream.shutdown()
+    response_capture.stop()
+    catalog.stop()
+    session_store.stop()
+
+
 setup_logging()
 misscore = FastAPI(
     title="misscore API docs",
     description="missav website backend api server",
-    version="0.0.1"
+    version="0.0.1",
+    lifespan=lifespan
 )
 register_middlewares(misscore)
 misscore.include_router(v1_router)
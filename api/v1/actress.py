@@ -1,21 +1,30 @@
 import logging
 from typing import Annotated
 
-import requests
 from fastapi import APIRouter, Query, Request
 from fastapi.datastructures import QueryParams
-from lxml import html
 
-from api.common.constants import HEADERS
+from api.common.constants import (
+    CACHE_TTL_LISTING,
+    CACHE_TTL_PRIVATE,
+    CACHE_TTL_RANKING,
+    UPSTREAM_BASE_URL,
+)
 from api.common.pasrer import (
     parse_actress_list,
     parse_actress_ranking,
-    parse_login,
     parse_url,
 )
-from api.common.util import movie_get, param_handler
+from api.common.util import (
+    data_response,
+    fetch_payload,
+    movie_get,
+    page_response,
+    param_handler,
+)
 from api.domain.auth import AuthKeyDepend
-from api.domain.model import BaseResponse, PageResult
+from api.domain.listing import ListingDepend
+from api.domain.model import ActressPageResponse, ActressRankingResponse, MoviePageResponse
 
 logger = logging.getLogger(__name__)
 app = APIRouter(
@@ -24,11 +33,11 @@ app = APIRouter(
 
 
 @app.get("/movies/{name}",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["ACTRESS API"],
          summary="get actress movies ",
          description="get actress movies from specify name")
-async def get_movies(request: Request, cookies: AuthKeyDepend, name: str, page: int = 1,
+async def get_movies(request: Request, cookies: AuthKeyDepend, listing: ListingDepend, name: str, page: int = 1,
                      filters: Annotated[str | None, Query(...,
                                                           title="moive filter query",
                                                           description="individual | multiple | chinese-subtitle | english-subtitle")] = None,
@@ -36,45 +45,37 @@ async def get_movies(request: Request, cookies: AuthKeyDepend, name: str, page:
                                                        title="sort param",
                                                        description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
 
-    return movie_get(request, cookies, parse_url(f'https://missav.ai/{request.state.lang}/actresses/{name}'))
+    return await movie_get(request, cookies, parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/actresses/{name}'), listing=listing)
 
 
 @app.get("/saved",
-         response_model=BaseResponse,
+         response_model=ActressPageResponse,
          tags=["ACTRESS API"],
          summary="user saved actress",
          description="user saved actress")
 async def saved(request: Request, cookies: AuthKeyDepend, page: int = 1):
-    response = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/saved/actresses?page={page}'), cookies=cookies,
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_actress_list(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/saved/actresses?page={page}'),
+                                       parse_actress_list, CACHE_TTL_PRIVATE)
+    if ret is not None:
+        return page_response(page, ret, encoded)
 
 
 @app.get("/ranking",
-         response_model=BaseResponse,
+         response_model=ActressRankingResponse,
          tags=["ACTRESS API"],
          summary="actress ranking",
          description="actress ranking")
 async def ranking(request: Request, cookies: AuthKeyDepend):
-    response = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/actresses/ranking'), cookies=cookies,
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_actress_ranking(tree)
-        return BaseResponse(data=ret)
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/actresses/ranking'),
+                                       parse_actress_ranking, CACHE_TTL_RANKING)
+    if ret is not None:
+        return data_response(ret, encoded)
 
 
 @app.get("/list",
-         response_model=BaseResponse,
+         response_model=ActressPageResponse,
          tags=["ACTRESS API"],
          summary="actress list",
          description="get all actress")
@@ -95,13 +96,9 @@ async def list(request: Request, cookies: AuthKeyDepend,
                sort: Annotated[str | None, Query(...,
                                                  title="sort param",
                                                  description="debug | videos")] = None):
-    response = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/actresses'), cookies=cookies,
-        params=param_handler(request.query_params),
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_actress_list(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/actresses'),
+                                       parse_actress_list, CACHE_TTL_LISTING,
+                                       params=param_handler(request.query_params))
+    if ret is not None:
+        return page_response(page, ret, encoded)
@@ -0,0 +1,37 @@
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Query, Request
+
+from api.common.catalog import catalog
+from api.common.util import page_response
+from api.domain.model import CatalogPageResponse
+
+logger = logging.getLogger(__name__)
+app = APIRouter(
+    prefix='/catalog',
+)
+
+
+@app.get("/movies",
+         response_model=CatalogPageResponse,
+         tags=["Catalog API"],
+         summary="Query the local movie catalog",
+         description="Query movies already seen by the API by actress, genre, maker, series or release date, without calling missav")
+async def movies(request: Request,
+                 actress: str | None = None,
+                 genre: str | None = None,
+                 maker: str | None = None,
+                 series: str | None = None,
+                 released_from: Annotated[str | None, Query(...,
+                                                            title="released from",
+                                                            description="release date lower bound, e.g. 2024-01-01")] = None,
+                 released_to: Annotated[str | None, Query(...,
+                                                          title="released to",
+                                                          description="release date upper bound, e.g. 2024-12-31")] = None,
+                 page: Annotated[int, Query(ge=1)] = 1,
+                 page_size: Annotated[int, Query(ge=1, le=100)] = 24):
+    total, data = catalog.search(request.state.lang, actress=actress, genre=genre, maker=maker, series=series,
+                                 released_from=released_from, released_to=released_to,
+                                 page=page, page_size=page_size)
+    return page_response(page, (len(data), (total + page_size - 1) // page_size, data))
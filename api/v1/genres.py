@@ -1,15 +1,14 @@
 import logging
 from typing import Annotated
 
-import requests
 from fastapi import APIRouter, Query, Request
-from lxml import html
 
-from api.common.constants import HEADERS
-from api.common.pasrer import parse_login, parse_movie_genres, parse_url
-from api.common.util import movie_get
+from api.common.constants import CACHE_TTL_INDEX, UPSTREAM_BASE_URL
+from api.common.pasrer import parse_movie_genres, parse_url
+from api.common.util import fetch_payload, movie_get, page_response
 from api.domain.auth import AuthKeyDepend
-from api.domain.model import BaseResponse, PageResult
+from api.domain.listing import ListingDepend
+from api.domain.model import GenrePageResponse, MoviePageResponse
 
 logger = logging.getLogger(__name__)
 app = APIRouter(
@@ -18,28 +17,25 @@ app = APIRouter(
 
 
 @app.get("",
-         response_model=BaseResponse,
+         response_model=GenrePageResponse,
          tags=["Genres API"],
          summary="Get all movie's Geners",
          description="Get all movie's Geners")
 async def get_genres(request: Request, cookies: AuthKeyDepend,
                      page: int = 1):
-    response = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/genres?page={page}'), headers=HEADERS,
-        cookies=cookies, verify=False)
-    if response.status_code == 200:
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_movie_genres(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/genres?page={page}'),
+                                       parse_movie_genres, CACHE_TTL_INDEX)
+    if ret is not None:
+        return page_response(page, ret, encoded)
 
 
 @app.get("/{name}",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Genres API"],
          summary="Query genres from specific name",
          description="Query genres from specific name")
-async def get_genres_detail(request: Request, cookies: AuthKeyDepend, name: str,
+async def get_genres_detail(request: Request, cookies: AuthKeyDepend, listing: ListingDepend, name: str,
                             filters: Annotated[str | None, Query(...,
                                                                  title="moive filter query",
                                                                  description="individual | multiple | chinese-subtitle | english-subtitle")] = None,
@@ -47,5 +43,5 @@ async def get_genres_detail(request: Request, cookies: AuthKeyDepend, name: str,
                                                               title="sort param",
                                                               description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None,
                             page: int = 1):
-    url = parse_url(f'https://missav.ai/{request.state.lang}/genres/{name}')
-    return movie_get(request, cookies, url)
+    url = parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/genres/{name}')
+    return await movie_get(request, cookies, url, listing=listing)
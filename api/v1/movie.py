@@ -1,22 +1,46 @@
 import logging
-from typing import Annotated
-
-import requests
-from fastapi import APIRouter, Query, Request
-from lxml import html
-
-from api.common.constants import HEADERS
+from typing import Annotated, Any, Literal
+
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from api.common.cache import encode_payload
+from api.common.catalog import LOCAL_FILTERS, LOCAL_SORTS, catalog
+from api.common.constants import (
+    BATCH_CONCURRENCY,
+    BATCH_MAX_ITEMS,
+    CACHE_TTL_DETAIL,
+    CACHE_TTL_HOT,
+    CACHE_TTL_PRIVATE,
+    CACHE_TTL_SEARCH,
+    UPSTREAM_BASE_URL,
+)
 from api.common.pasrer import (
-    parse_login,
     parse_movie_detail,
     parse_movie_list,
+    parse_movie_meta,
     parse_movie_search,
     parse_uncensored_moives,
     parse_url,
 )
-from api.common.util import movie_get, param_handler
+from api.common.util import (
+    data_response,
+    fan_out,
+    fetch_payload,
+    movie_get,
+    page_response,
+    param_handler,
+    record_payload,
+)
 from api.domain.auth import AuthKeyDepend
-from api.domain.model import BaseResponse, PageResult
+from api.domain.listing import ListingDepend
+from api.domain.model import (
+    BatchInput,
+    BatchResponse,
+    LocalSearchResponse,
+    MoviePageResponse,
+    MovieResponse,
+    MovieSearchResponse,
+)
 
 logger = logging.getLogger(__name__)
 app = APIRouter(
@@ -25,26 +49,73 @@ app = APIRouter(
 
 
 @app.get("/number/{number}",
-         response_model=BaseResponse,
+         response_model=MovieResponse,
          tags=["Movie API"],
          summary="Get movie by specified number",
          description="Get movie by specified number")
-async def get_movie(request: Request, cookies: AuthKeyDepend, number: str):
-    response = requests.get(
-        url=parse_url(
-            f'https://missav.ai/{request.state.lang}/{number}'),
-        cookies=cookies,
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_movie_detail(tree)
-        return BaseResponse(data=ret)
+async def get_movie(request: Request, cookies: AuthKeyDepend, number: str,
+                    lite: Annotated[bool, Query(...,
+                                                title="metadata only",
+                                                description="only return title, link, description and cover, stops reading the page after <head>")] = False):
+    ret, encoded = await movie_detail(request, cookies, number, lite)
+    if ret is not None:
+        return data_response(ret, encoded)
+
+
+@app.post("/batch",
+          response_model=BatchResponse,
+          tags=["Movie API"],
+          summary="Get many movies by number",
+          description="Get details of many movies by number at once, each item carries its own data or error")
+async def batch(request: Request, cookies: AuthKeyDepend, input: BatchInput,
+                concurrency: Annotated[int, Query(...,
+                                                  title="concurrency",
+                                                  description=f"upstream requests in flight, at most {BATCH_CONCURRENCY}",
+                                                  ge=1, le=BATCH_CONCURRENCY)] = BATCH_CONCURRENCY,
+                lite: Annotated[bool, Query(...,
+                                            title="metadata only",
+                                            description="only return title, link, description and cover of each movie")] = False):
+    return await movie_batch(request, cookies, input.numbers, lite, concurrency)
+
+
+@app.post("/batch/lite",
+          response_model=BatchResponse,
+          tags=["Movie API"],
+          deprecated=True,
+          summary="Get metadata of many movies",
+          description="Same as /batch?lite=true, kept for existing clients")
+async def batch_lite(request: Request, cookies: AuthKeyDepend, input: BatchInput):
+    return await batch(request, cookies, input, lite=True)
+
+
+async def movie_batch(request: Request, cookies: dict, numbers: list[str], lite: bool, concurrency: int):
+    if len(numbers) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f'At most {BATCH_MAX_ITEMS} numbers per batch')
+
+    async def detail(number: str):
+        movie, _ = await movie_detail(request, cookies, number, lite)
+        return movie
+
+    results = await fan_out(numbers, detail, concurrency)
+    return data_response([{"number": number, **result} for number, result in zip(numbers, results)])
+
+
+async def movie_detail(request: Request, cookies: dict, number: str, lite: bool = False) -> tuple[Any, bytes | None]:
+    """(movie, its encoded JSON), from the local catalog when it has a recent enough copy"""
+    if not lite:
+        # 本地目录里足够新的详情直接返回
+        movie = catalog.get_detail(request.state.lang, number)
+        if movie is not None:
+            encoded = encode_payload(movie)
+            record_payload(request, movie, 0, encoded=encoded)
+            return movie, encoded
+    url = parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/{number}')
+    parser = parse_movie_meta if lite else parse_movie_detail
+    return await fetch_payload(request, cookies, url, parser, CACHE_TTL_DETAIL)
 
 
 @app.get("/search/{keyword}",
-         response_model=BaseResponse,
+         response_model=MovieSearchResponse | LocalSearchResponse,
          tags=["Movie API"],
          summary="search moive from missav",
          description="search moive from missav")
@@ -56,27 +127,41 @@ async def search(request: Request, cookies: AuthKeyDepend,
                                                       description="individual | jav | asiaav | uncensored-leak | uncensored | chinese-subtitle | english-subtitle")] = None,
                  sort: Annotated[str | None, Query(...,
                                                    title="sort param",
-                                                   description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    response = requests.get(
-        url=parse_url(
-            f'https://missav.ai/{request.state.lang}/search/{keyword}'),
-        cookies=cookies,
-        params=param_handler(request.query_params),
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_movie_search(tree)
-        return BaseResponse(data=PageResult(current_page=request.query_params.get('page'), page_size=ret[0], page_count=ret[1], data=ret[2]))
+                                                   description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None,
+                 source: Annotated[Literal['remote', 'local'], Query(...,
+                                                                     title="search source",
+                                                                     description="remote searches missav, local searches the catalog (filters: uncensored-leak | chinese-subtitle | english-subtitle, sort: released_at)")] = 'remote'):
+    if source == 'local':
+        return local_search(request, keyword, page, filters, sort)
+    params = param_handler(request.query_params)
+    # source 只在本地使用, 不发给上游, 也不进入缓存键
+    params.pop('source', None)
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/search/{keyword}'),
+                                       parse_movie_search, CACHE_TTL_SEARCH, params=params)
+    if ret is not None:
+        return page_response(page, ret, encoded)
+
+
+def local_search(request: Request, keyword: str, page: int, filters: str | None, sort: str | None):
+    if not catalog.enabled:
+        raise HTTPException(status_code=503, detail='Local catalog is disabled')
+    if filters is not None and filters not in LOCAL_FILTERS:
+        raise HTTPException(status_code=400, detail=f'filters={filters} is not supported by local search')
+    if sort not in LOCAL_SORTS:
+        raise HTTPException(status_code=400, detail=f'sort={sort} is not supported by local search')
+    page_size = 24
+    total, movies, actresses = catalog.full_text(request.state.lang, keyword, filters, sort, page, page_size)
+    return page_response(page, (len(movies), (total + page_size - 1) // page_size,
+                                {"actress": actresses, "moives": movies}))
 
 
 @app.get("/new",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="Get the new movies",
          description="Get the new movies")
-async def get_new(request: Request, cookies: AuthKeyDepend,
+async def get_new(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                   page: int = 1,
                   filters: Annotated[str | None, Query(...,
                                                        title="moive filter query",
@@ -84,16 +169,16 @@ async def get_new(request: Request, cookies: AuthKeyDepend,
                   sort: Annotated[str | None, Query(...,
                                                     title="sort param",
                                                     description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/{request.state.lang}/new'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/{request.state.lang}/new'), listing=listing)
 
 
 @app.get("/release",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="Get the latest released movies",
          description="Get the latest released movies")
-async def get_release(request: Request, cookies: AuthKeyDepend,
+async def get_release(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                       page: int = 1,
                       filters: Annotated[str | None, Query(...,
                                                            title="moive filter query",
@@ -101,16 +186,16 @@ async def get_release(request: Request, cookies: AuthKeyDepend,
                       sort: Annotated[str | None, Query(...,
                                                         title="sort param",
                                                         description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/{request.state.lang}/release'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/{request.state.lang}/release'), listing=listing)
 
 
 @app.get("/hot/today",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="Get today's popular movies",
          description="Get today's popular movies")
-async def get_hot_today(request: Request, cookies: AuthKeyDepend,
+async def get_hot_today(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                         page: int = 1,
                         filters: Annotated[str | None, Query(...,
                                                              title="moive filter query",
@@ -118,16 +203,16 @@ async def get_hot_today(request: Request, cookies: AuthKeyDepend,
                         sort: Annotated[str | None, Query(...,
                                                           title="sort param",
                                                           description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm291/{request.state.lang}/today-hot'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm291/{request.state.lang}/today-hot'), ttl=CACHE_TTL_HOT, listing=listing)
 
 
 @app.get("/hot/today",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="Get today's popular movies",
          description="Get today's popular movies")
-async def get_hot_today(request: Request, cookies: AuthKeyDepend,
+async def get_hot_today(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                         page: int = 1,
                         filters: Annotated[str | None, Query(...,
                                                              title="moive filter query",
@@ -135,16 +220,16 @@ async def get_hot_today(request: Request, cookies: AuthKeyDepend,
                         sort: Annotated[str | None, Query(...,
                                                           title="sort param",
                                                           description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm291/{request.state.lang}/today-hot'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm291/{request.state.lang}/today-hot'), ttl=CACHE_TTL_HOT, listing=listing)
 
 
 @app.get("/hot/weekly",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="Get weekly's popular movies",
          description="Get weekly's popular movies")
-async def get_hot_weekly(request: Request, cookies: AuthKeyDepend,
+async def get_hot_weekly(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                          page: int = 1,
                          filters: Annotated[str | None, Query(...,
                                                               title="moive filter query",
@@ -152,16 +237,16 @@ async def get_hot_weekly(request: Request, cookies: AuthKeyDepend,
                          sort: Annotated[str | None, Query(...,
                                                            title="sort param",
                                                            description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm169/{request.state.lang}/weekly-hot'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm169/{request.state.lang}/weekly-hot'), ttl=CACHE_TTL_HOT, listing=listing)
 
 
 @app.get("/hot/monthly",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="Get monthly's popular movies",
          description="Get monthly's popular movies")
-async def get_hot_monthly(request: Request, cookies: AuthKeyDepend,
+async def get_hot_monthly(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                           page: int = 1,
                           filters: Annotated[str | None, Query(...,
                                                                title="moive filter query",
@@ -169,16 +254,16 @@ async def get_hot_monthly(request: Request, cookies: AuthKeyDepend,
                           sort: Annotated[str | None, Query(...,
                                                             title="sort param",
                                                             description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm256/{request.state.lang}/monthly-hot'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm256/{request.state.lang}/monthly-hot'), ttl=CACHE_TTL_HOT, listing=listing)
 
 
 @app.get("/vr",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="Get vr movies",
          description="Get vr movies")
-async def get_vr(request: Request, cookies: AuthKeyDepend,
+async def get_vr(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                  page: int = 1,
                  filters: Annotated[str | None, Query(...,
                                                       title="moive filter query",
@@ -186,33 +271,29 @@ async def get_vr(request: Request, cookies: AuthKeyDepend,
                  sort: Annotated[str | None, Query(...,
                                                    title="sort param",
                                                    description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm2091/{request.state.lang}/genres/VR'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm2091/{request.state.lang}/genres/VR'), listing=listing)
 
 
 @app.get("/saved",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="user saved moives",
          description="user saved moives")
 async def saved(request: Request, cookies: AuthKeyDepend, page: int = 1):
-    response = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/saved?page={page}'), cookies=cookies,
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_movie_list(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/saved?page={page}'),
+                                       parse_movie_list, CACHE_TTL_PRIVATE)
+    if ret is not None:
+        return page_response(page, ret, encoded)
 
 
 @app.get("/uncensored",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored-leak moives",
          description="get the uncensored-leak moives")
-async def get_uncensored_leak(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_leak(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                               page: int = 1,
                               filters: Annotated[str | None, Query(...,
                                                                    title="moive filter query",
@@ -220,26 +301,16 @@ async def get_uncensored_leak(request: Request, cookies: AuthKeyDepend,
                               sort: Annotated[str | None, Query(...,
                                                                 title="sort param",
                                                                 description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    response = requests.get(
-        url=parse_url(
-            f'https://missav.ai/dm620/{request.state.lang}/uncensored-leak'),
-        cookies=cookies,
-        params=param_handler(request.query_params),
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_uncensored_moives(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm620/{request.state.lang}/uncensored-leak'), parser=parse_uncensored_moives, listing=listing)
 
 
 @app.get("/uncensored/fc2",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored fc2 moives",
          description="get the uncensored fc2 moives")
-async def get_uncensored_fc2(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_fc2(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                              page: int = 1,
                              filters: Annotated[str | None, Query(...,
                                                                   title="moive filter query",
@@ -247,16 +318,16 @@ async def get_uncensored_fc2(request: Request, cookies: AuthKeyDepend,
                              sort: Annotated[str | None, Query(...,
                                                                title="sort param",
                                                                description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm97/{request.state.lang}/fc2'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm97/{request.state.lang}/fc2'), listing=listing)
 
 
 @app.get("/uncensored/tokyohot",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored tokyohot moives",
          description="get the uncensored tokyohot moives")
-async def get_uncensored_tokyohot(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_tokyohot(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                   page: int = 1,
                                   filters: Annotated[str | None, Query(...,
                                                                        title="moive filter query",
@@ -264,16 +335,16 @@ async def get_uncensored_tokyohot(request: Request, cookies: AuthKeyDepend,
                                   sort: Annotated[str | None, Query(...,
                                                                     title="sort param",
                                                                     description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm29/{request.state.lang}/tokyohot'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm29/{request.state.lang}/tokyohot'), listing=listing)
 
 
 @app.get("/uncensored/1pondo",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored 1pondo moives",
          description="get the uncensored 1pondo moives")
-async def get_uncensored_1pondo(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_1pondo(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                 page: int = 1,
                                 filters: Annotated[str | None, Query(...,
                                                                      title="moive filter query",
@@ -281,16 +352,16 @@ async def get_uncensored_1pondo(request: Request, cookies: AuthKeyDepend,
                                 sort: Annotated[str | None, Query(...,
                                                                   title="sort param",
                                                                   description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm408463/{request.state.lang}/1pondo'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm408463/{request.state.lang}/1pondo'), listing=listing)
 
 
 @app.get("/uncensored/marriedslash",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored marriedslash moives",
          description="get the uncensored marriedslash moives")
-async def get_uncensored_marriedslash(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_marriedslash(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                       page: int = 1,
                                       filters: Annotated[str | None, Query(...,
                                                                            title="moive filter query",
@@ -298,16 +369,16 @@ async def get_uncensored_marriedslash(request: Request, cookies: AuthKeyDepend,
                                       sort: Annotated[str | None, Query(...,
                                                                         title="sort param",
                                                                         description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm24/{request.state.lang}/marriedslash'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm24/{request.state.lang}/marriedslash'), listing=listing)
 
 
 @app.get("/uncensored/heyzo",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored heyzo moives",
          description="get the uncensored heyzo moives")
-async def get_uncensored_heyzo(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_heyzo(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                page: int = 1,
                                filters: Annotated[str | None, Query(...,
                                                                     title="moive filter query",
@@ -315,16 +386,16 @@ async def get_uncensored_heyzo(request: Request, cookies: AuthKeyDepend,
                                sort: Annotated[str | None, Query(...,
                                                                  title="sort param",
                                                                  description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm53663/{request.state.lang}/heyzo'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm53663/{request.state.lang}/heyzo'), listing=listing)
 
 
 @app.get("/uncensored/xxxav",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored xxxav moives",
          description="get the uncensored xxxav moives")
-async def get_uncensored_xxxav(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_xxxav(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                page: int = 1,
                                filters: Annotated[str | None, Query(...,
                                                                     title="moive filter query",
@@ -332,16 +403,16 @@ async def get_uncensored_xxxav(request: Request, cookies: AuthKeyDepend,
                                sort: Annotated[str | None, Query(...,
                                                                  title="sort param",
                                                                  description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm29/{request.state.lang}/xxxav'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm29/{request.state.lang}/xxxav'), listing=listing)
 
 
 @app.get("/uncensored/naughty4610",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored naughty4610 moives",
          description="get the uncensored naughty4610 moives")
-async def get_uncensored_naughty4610(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_naughty4610(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                      page: int = 1,
                                      filters: Annotated[str | None, Query(...,
                                                                           title="moive filter query",
@@ -349,16 +420,16 @@ async def get_uncensored_naughty4610(request: Request, cookies: AuthKeyDepend,
                                      sort: Annotated[str | None, Query(...,
                                                                        title="sort param",
                                                                        description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm19/{request.state.lang}/naughty4610'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm19/{request.state.lang}/naughty4610'), listing=listing)
 
 
 @app.get("/uncensored/naughty0930",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored naughty0930 moives",
          description="get the uncensored naughty0930 moives")
-async def get_uncensored_naughty0930(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_naughty0930(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                      page: int = 1,
                                      filters: Annotated[str | None, Query(...,
                                                                           title="moive filter query",
@@ -366,16 +437,16 @@ async def get_uncensored_naughty0930(request: Request, cookies: AuthKeyDepend,
                                      sort: Annotated[str | None, Query(...,
                                                                        title="sort param",
                                                                        description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm22/{request.state.lang}/naughty0930'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm22/{request.state.lang}/naughty0930'), listing=listing)
 
 
 @app.get("/uncensored/caribbeancom",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored caribbeancom moives",
          description="get the uncensored caribbeancom moives")
-async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                       page: int = 1,
                                       filters: Annotated[str | None, Query(...,
                                                                            title="moive filter query",
@@ -383,16 +454,16 @@ async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend,
                                       sort: Annotated[str | None, Query(...,
                                                                         title="sort param",
                                                                         description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm584255/{request.state.lang}/caribbeancom'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm584255/{request.state.lang}/caribbeancom'), listing=listing)
 
 
 @app.get("/uncensored/caribbeancompr",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored caribbeancompr moives",
          description="get the uncensored caribbeancompr moives")
-async def get_uncensored_caribbeancompr(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_caribbeancompr(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                         page: int = 1,
                                         filters: Annotated[str | None, Query(...,
                                                                              title="moive filter query",
@@ -400,16 +471,16 @@ async def get_uncensored_caribbeancompr(request: Request, cookies: AuthKeyDepend
                                         sort: Annotated[str | None, Query(...,
                                                                           title="sort param",
                                                                           description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm8246/{request.state.lang}/caribbeancompr'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm8246/{request.state.lang}/caribbeancompr'), listing=listing)
 
 
 @app.get("/uncensored/10musume",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored 10musume moives",
          description="get the uncensored 10musume moives")
-async def get_uncensored_10musume(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_10musume(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                   page: int = 1,
                                   filters: Annotated[str | None, Query(...,
                                                                        title="moive filter query",
@@ -417,16 +488,16 @@ async def get_uncensored_10musume(request: Request, cookies: AuthKeyDepend,
                                   sort: Annotated[str | None, Query(...,
                                                                     title="sort param",
                                                                     description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm620677/{request.state.lang}/10musume'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm620677/{request.state.lang}/10musume'), listing=listing)
 
 
 @app.get("/uncensored/pacopacomama",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored pacopacomama moives",
          description="get the uncensored pacopacomama moives")
-async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                       page: int = 1,
                                       filters: Annotated[str | None, Query(...,
                                                                            title="moive filter query",
@@ -434,16 +505,16 @@ async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend,
                                       sort: Annotated[str | None, Query(...,
                                                                         title="sort param",
                                                                         description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm12454/{request.state.lang}/pacopacomama'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm12454/{request.state.lang}/pacopacomama'), listing=listing)
 
 
 @app.get("/uncensored/gachinco",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the uncensored gachinco moives",
          description="get the uncensored gachinco moives")
-async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend,
+async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                       page: int = 1,
                                       filters: Annotated[str | None, Query(...,
                                                                            title="moive filter query",
@@ -451,16 +522,16 @@ async def get_uncensored_caribbeancom(request: Request, cookies: AuthKeyDepend,
                                       sort: Annotated[str | None, Query(...,
                                                                         title="sort param",
                                                                         description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm135/{request.state.lang}/gachinco'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm135/{request.state.lang}/gachinco'), listing=listing)
 
 
 @app.get("/asia-av/madou",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the madou moives",
          description="get the madou moives")
-async def get_madou(request: Request, cookies: AuthKeyDepend,
+async def get_madou(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                     page: int = 1,
                     filters: Annotated[str | None, Query(...,
                                                          title="moive filter query",
@@ -468,16 +539,16 @@ async def get_madou(request: Request, cookies: AuthKeyDepend,
                     sort: Annotated[str | None, Query(...,
                                                       title="sort param",
                                                       description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm34/{request.state.lang}/madou'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm34/{request.state.lang}/madou'), listing=listing)
 
 
 @app.get("/asia-av/twav",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the twav moives",
          description="get the twav moives")
-async def get_twav(request: Request, cookies: AuthKeyDepend,
+async def get_twav(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                    page: int = 1,
                    filters: Annotated[str | None, Query(...,
                                                         title="moive filter query",
@@ -485,16 +556,16 @@ async def get_twav(request: Request, cookies: AuthKeyDepend,
                    sort: Annotated[str | None, Query(...,
                                                      title="sort param",
                                                      description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm17/{request.state.lang}/twav'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm17/{request.state.lang}/twav'), listing=listing)
 
 
 @app.get("/asia-av/furuke",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the furuke moives",
          description="get the furuke moives")
-async def get_furuke(request: Request, cookies: AuthKeyDepend,
+async def get_furuke(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                      page: int = 1,
                      filters: Annotated[str | None, Query(...,
                                                           title="moive filter query",
@@ -502,16 +573,16 @@ async def get_furuke(request: Request, cookies: AuthKeyDepend,
                      sort: Annotated[str | None, Query(...,
                                                        title="sort param",
                                                        description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm15/{request.state.lang}/furuke'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm15/{request.state.lang}/furuke'), listing=listing)
 
 
 @app.get("/streamer/kr",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the klive",
          description="get the klive")
-async def get_kr_streamer(request: Request, cookies: AuthKeyDepend,
+async def get_kr_streamer(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                           page: int = 1,
                           filters: Annotated[str | None, Query(...,
                                                                title="moive filter query",
@@ -519,16 +590,16 @@ async def get_kr_streamer(request: Request, cookies: AuthKeyDepend,
                           sort: Annotated[str | None, Query(...,
                                                             title="sort param",
                                                             description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/{request.state.lang}/klive'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/{request.state.lang}/klive'), listing=listing)
 
 
 @app.get("/streamer/cn",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get the clive",
          description="get the clive")
-async def get_kr_streamer(request: Request, cookies: AuthKeyDepend,
+async def get_kr_streamer(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                           page: int = 1,
                           filters: Annotated[str | None, Query(...,
                                                                title="moive filter query",
@@ -536,16 +607,16 @@ async def get_kr_streamer(request: Request, cookies: AuthKeyDepend,
                           sort: Annotated[str | None, Query(...,
                                                             title="sort param",
                                                             description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/{request.state.lang}/clive'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/{request.state.lang}/clive'), listing=listing)
 
 
 @app.get("/amateur/siro",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get siro moives",
          description="get siro moives")
-async def get_amateur_siro(request: Request, cookies: AuthKeyDepend,
+async def get_amateur_siro(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                            page: int = 1,
                            filters: Annotated[str | None, Query(...,
                                                                 title="moive filter query",
@@ -553,16 +624,16 @@ async def get_amateur_siro(request: Request, cookies: AuthKeyDepend,
                            sort: Annotated[str | None, Query(...,
                                                              title="sort param",
                                                              description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm23/{request.state.lang}/siro'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm23/{request.state.lang}/siro'), listing=listing)
 
 
 @app.get("/amateur/luxu",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get luxu moives",
          description="get luxu moives")
-async def get_amateur_luxu(request: Request, cookies: AuthKeyDepend,
+async def get_amateur_luxu(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                            page: int = 1,
                            filters: Annotated[str | None, Query(...,
                                                                 title="moive filter query",
@@ -570,16 +641,16 @@ async def get_amateur_luxu(request: Request, cookies: AuthKeyDepend,
                            sort: Annotated[str | None, Query(...,
                                                              title="sort param",
                                                              description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm20/{request.state.lang}/luxu'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm20/{request.state.lang}/luxu'), listing=listing)
 
 
 @app.get("/amateur/gana",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get gana moives",
          description="get gana moives")
-async def get_amateur_gana(request: Request, cookies: AuthKeyDepend,
+async def get_amateur_gana(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                            page: int = 1,
                            filters: Annotated[str | None, Query(...,
                                                                 title="moive filter query",
@@ -587,16 +658,16 @@ async def get_amateur_gana(request: Request, cookies: AuthKeyDepend,
                            sort: Annotated[str | None, Query(...,
                                                              title="sort param",
                                                              description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm17/{request.state.lang}/gana'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm17/{request.state.lang}/gana'), listing=listing)
 
 
 @app.get("/amateur/maan",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get maan moives",
          description="get simaanro moives")
-async def get_amateur_maan(request: Request, cookies: AuthKeyDepend,
+async def get_amateur_maan(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                            page: int = 1,
                            filters: Annotated[str | None, Query(...,
                                                                 title="moive filter query",
@@ -604,16 +675,16 @@ async def get_amateur_maan(request: Request, cookies: AuthKeyDepend,
                            sort: Annotated[str | None, Query(...,
                                                              title="sort param",
                                                              description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm862/{request.state.lang}/maan'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm862/{request.state.lang}/maan'), listing=listing)
 
 
 @app.get("/amateur/scute",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get scute moives",
          description="get scute moives")
-async def get_amateur_scute(request: Request, cookies: AuthKeyDepend,
+async def get_amateur_scute(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                             page: int = 1,
                             filters: Annotated[str | None, Query(...,
                                                                  title="moive filter query",
@@ -621,16 +692,16 @@ async def get_amateur_scute(request: Request, cookies: AuthKeyDepend,
                             sort: Annotated[str | None, Query(...,
                                                               title="sort param",
                                                               description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm23/{request.state.lang}/scute'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm23/{request.state.lang}/scute'), listing=listing)
 
 
 @app.get("/amateur/ara",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get ara moives",
          description="get ara moives")
-async def get_amateur_ara(request: Request, cookies: AuthKeyDepend,
+async def get_amateur_ara(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                           page: int = 1,
                           filters: Annotated[str | None, Query(...,
                                                                title="moive filter query",
@@ -638,16 +709,16 @@ async def get_amateur_ara(request: Request, cookies: AuthKeyDepend,
                           sort: Annotated[str | None, Query(...,
                                                             title="sort param",
                                                             description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    return movie_get(request=request, cookies=cookies, url=parse_url(
-        f'https://missav.ai/dm19/{request.state.lang}/ara'))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm19/{request.state.lang}/ara'), listing=listing)
 
 
 @app.get("/chinese-subtitle",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get chinese subtitle moives",
          description="get all chinese subtitle moives")
-async def get_chinese_subtitle(request: Request, cookies: AuthKeyDepend,
+async def get_chinese_subtitle(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                page: int = 1,
                                filters: Annotated[str | None, Query(...,
                                                                     title="moive filter query",
@@ -655,26 +726,16 @@ async def get_chinese_subtitle(request: Request, cookies: AuthKeyDepend,
                                sort: Annotated[str | None, Query(...,
                                                                  title="sort param",
                                                                  description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    response = requests.get(
-        url=parse_url(
-            f'https://missav.ai/dm265/{request.state.lang}/chinese-subtitle'),
-        cookies=cookies,
-        params=param_handler(request.query_params),
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_movie_list(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm265/{request.state.lang}/chinese-subtitle'), listing=listing)
 
 
 @app.get("/english-subtitle",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="get english subtitle moives",
          description="get all english subtitle moives")
-async def get_english_subtitle(request: Request, cookies: AuthKeyDepend,
+async def get_english_subtitle(request: Request, cookies: AuthKeyDepend, listing: ListingDepend,
                                page: int = 1,
                                filters: Annotated[str | None, Query(...,
                                                                     title="moive filter query",
@@ -682,31 +743,18 @@ async def get_english_subtitle(request: Request, cookies: AuthKeyDepend,
                                sort: Annotated[str | None, Query(...,
                                                                  title="the actress's cup",
                                                                  description="saved | released_at | published_at | today_views | weekly_views | monthly_views | views")] = None):
-    response = requests.get(
-        url=parse_url(
-            f'https://missav.ai/dm265/{request.state.lang}/english-subtitle'),
-        params=param_handler(request.query_params),
-        cookies=cookies,
-        headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        logger.info(response.text)
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_movie_list(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    return await movie_get(request=request, cookies=cookies, url=parse_url(
+        f'{UPSTREAM_BASE_URL}/dm265/{request.state.lang}/english-subtitle'), listing=listing)
 
 
 @app.get("/watch-history",
-         response_model=BaseResponse,
+         response_model=MoviePageResponse,
          tags=["Movie API"],
          summary="user watch history",
          description="user watch history")
 async def history(request: Request, cookies: AuthKeyDepend, page: int = 1):
-    response = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/history'), headers=HEADERS,
-        cookies=cookies, verify=False)
-    if response.status_code == 200:
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_movie_list(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/history'),
+                                       parse_movie_list, CACHE_TTL_PRIVATE)
+    if ret is not None:
+        return page_response(page, ret, encoded)
@@ -1,19 +1,25 @@
 import logging
 
-import requests
 from fastapi import APIRouter, Path, Request
-from lxml import html
 
-from api.common.constants import HEADERS
+from api.common import upstream
+from api.common.constants import CACHE_TTL_PRIVATE, UPSTREAM_BASE_URL
 from api.common.pasrer import (
+    parse_html,
     parse_login,
     parse_playlist_delete_token,
     parse_playlist_detail,
     parse_playlists,
     parse_url,
 )
+from api.common.util import fetch_payload, page_response
 from api.domain.auth import AuthKeyDepend
-from api.domain.model import BaseResponse, PageResult, PlaylistInput
+from api.domain.model import (
+    BaseResponse,
+    PlaylistDetailResponse,
+    PlaylistInput,
+    PlaylistPageResponse,
+)
 
 logger = logging.getLogger(__name__)
 app = APIRouter(
@@ -22,23 +28,20 @@ app = APIRouter(
 
 
 @app.get("",
-         response_model=BaseResponse,
+         response_model=PlaylistPageResponse,
          tags=["Playlist API"],
          summary="playlists",
          description="get all playlists of user")
 async def playlists(request: Request, cookies: AuthKeyDepend, page: int = 1):
-    response = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/playlists?page={page}'), headers=HEADERS,
-        cookies=cookies, verify=False)
-    if response.status_code == 200:
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_playlists(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/playlists?page={page}'),
+                                       parse_playlists, CACHE_TTL_PRIVATE)
+    if ret is not None:
+        return page_response(page, ret, encoded)
 
 
 @app.get("/detail/{key}",
-         response_model=BaseResponse,
+         response_model=PlaylistDetailResponse,
          tags=["Playlist API"],
          summary="playlists detail info",
          description="get playlist detail info of user ")
@@ -46,14 +49,11 @@ async def playlists(request: Request, cookies: AuthKeyDepend,
                     key: str = Path(...,
                                     title="playlist key",
                                     description="set playlist key, return playlist detail info"), page: int = 1):
-    response = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/playlists/{key}?page={page}'), headers=HEADERS,
-        cookies=cookies, verify=False)
-    if response.status_code == 200:
-        tree = html.fromstring(response.text)
-        parse_login(tree)
-        ret = parse_playlist_detail(tree)
-        return BaseResponse(data=PageResult(current_page=page, page_size=ret[0], page_count=ret[1], data=ret[2]))
+    ret, encoded = await fetch_payload(request, cookies,
+                                       parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/playlists/{key}?page={page}'),
+                                       parse_playlist_detail, CACHE_TTL_PRIVATE)
+    if ret is not None:
+        return page_response(page, ret, encoded)
 
 
 @app.post("",
@@ -63,14 +63,14 @@ async def playlists(request: Request, cookies: AuthKeyDepend,
           description="create a playlists")
 async def create_playlists(request: Request, cookies: AuthKeyDepend,
                            input: PlaylistInput):
-    response = requests.post(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/playlists/create'), headers=HEADERS,
+    response = await upstream.post(
+        url=parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/playlists/create'),
         json={
             "name": "wukong",
             "description": "this is test",
             "scope": 0
         },
-        cookies=cookies, verify=False)
+        cookies=cookies)
     if response.status_code == 200:
         return BaseResponse()
     return BaseResponse(success=False, code=response.status_code, message=response.text)
@@ -83,24 +83,23 @@ async def create_playlists(request: Request, cookies: AuthKeyDepend,
             description="delete a playlist")
 async def delete_playlist(request: Request, cookies: AuthKeyDepend,
                           key: str):
-    html_res = requests.get(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/playlists/{key}/edit'), headers=HEADERS,
-        cookies=cookies, verify=False)
+    html_res = await upstream.get(
+        url=parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/playlists/{key}/edit'), cookies=cookies)
     if html_res.status_code == 200:
-        tree = html.fromstring(html_res.text)
+        tree = parse_html(html_res.text)
         parse_login(tree)
         ret = parse_playlist_delete_token(tree)
 
-    response = requests.post(
-        url=parse_url(f'https://missav.ai/{request.state.lang}/playlists/{key}'), headers=HEADERS,
+    response = await upstream.post(
+        url=parse_url(f'{UPSTREAM_BASE_URL}/{request.state.lang}/playlists/{key}'),
         data={
             "_method": "delete",
             "_token": ret
         },
-        cookies=cookies, verify=False)
+        cookies=cookies)
     if response.status_code == 200:
         return BaseResponse()
-    return BaseResponse(success=False, code=response.status_code, message=response.reason)
+    return BaseResponse(success=False, code=response.status_code, message=response.reason_phrase)
 
 
 @app.delete("/{key}/{number}",
@@ -110,9 +109,8 @@ async def delete_playlist(request: Request, cookies: AuthKeyDepend,
             description="Remove an movie from the playlist")
 async def remove_movie(request: Request, cookies: AuthKeyDepend,
                        key: str, number: str,):
-    response = requests.delete(
-        url=parse_url(f'https://missav.ai/api/playlists/{key}/{number}'), headers=HEADERS,
-        cookies=cookies, verify=False)
+    response = await upstream.delete(
+        url=parse_url(f'{UPSTREAM_BASE_URL}/api/playlists/{key}/{number}'), cookies=cookies)
     if response.status_code == 200:
         return BaseResponse()
     return BaseResponse(success=False, code=response.status_code, message=response.text)
@@ -125,12 +123,12 @@ async def remove_movie(request: Request, cookies: AuthKeyDepend,
           description="comment a playlist")
 async def comment(request: Request, cookies: AuthKeyDepend, key: str, number: str,
                   comment: str):
-    response = requests.post(
-        url=parse_url(f'https://missav.ai/api/playlists/{key}/{number}/comment'), headers=HEADERS,
+    response = await upstream.post(
+        url=parse_url(f'{UPSTREAM_BASE_URL}/api/playlists/{key}/{number}/comment'),
         json={
             "comment": comment
         },
-        cookies=cookies, verify=False)
+        cookies=cookies)
     if response.status_code == 200:
         return BaseResponse()
     return BaseResponse(success=False, code=response.status_code, message=response.text)
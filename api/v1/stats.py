@@ -0,0 +1,38 @@
+import logging
+
+from fastapi import APIRouter
+
+from api.common import upstream
+from api.common.cache import response_cache
+from api.common.capture import response_capture
+from api.common.catalog import catalog
+from api.common.governor import governor
+from api.common.session import session_store
+from api.common.singleflight import upstream_flight
+from api.common.sync import syncer
+from api.common.warmer import warmer
+from api.domain.model import BaseResponse
+
+logger = logging.getLogger(__name__)
+app = APIRouter(
+    prefix='/stats',
+)
+
+
+@app.get("",
+         response_model=BaseResponse,
+         tags=["Stats API"],
+         summary="runtime stats",
+         description="upstream connection pool, upstream rate governor, response cache, request coalescing, response capture, catalog, sync, cache warmer and login session stats")
+async def stats():
+    return BaseResponse(data={
+        "upstream": upstream.stats(),
+        "governor": governor.stats(),
+        "cache": response_cache.stats(),
+        "coalescing": upstream_flight.stats(),
+        "capture": response_capture.stats(),
+        "catalog": catalog.stats(),
+        "sync": syncer.stats(),
+        "warmer": warmer.stats(),
+        "sessions": session_store.stats(),
+    })
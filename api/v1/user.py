@@ -1,9 +1,8 @@
 import logging
 
-import requests
 from fastapi import APIRouter
 
-from api.common.constants import HEADERS
+from api.common.session import session_store, upstream_login
 from api.domain.model import BaseResponse, UserInfo
 
 logger = logging.getLogger(__name__)
@@ -16,15 +15,10 @@ app = APIRouter(
           response_model=BaseResponse,
           tags=["User API"],
           summary="user login",
-          description="user login from missav")
+          description="user login from missav, returns a session token to send as the auth-key header")
 async def login(user: UserInfo):
-    response = requests.post(url='https://missav.ai/api/login',
-                             data={'email': user.email, 'password': user.password}, headers=HEADERS, verify=False)
-    if response.status_code == 200:
-        cookie_info = response.cookies.get_dict()
-        if "user_uuid" in cookie_info:
-            cookie_str = "; ".join(
-                [f"{key}={value}" for key, value in cookie_info.items()])
-            return BaseResponse(data=cookie_str)
-    return BaseResponse(success=False, code=response.status_code,
+    status, cookies = await upstream_login(user.email, user.password)
+    if cookies is not None:
+        return BaseResponse(data=session_store.create(cookies, user.email, user.password))
+    return BaseResponse(success=False, code=status,
                         message="Login failed, check your network connection or account information.")
@@ -0,0 +1,129 @@
+"""End-to-end load test: the real app in front of a replaying fake missav.
+
+Starts the stub upstream in-process, runs `uvicorn api.main:misscore` in a
+subprocess pointed at it through MISSCORE_UPSTREAM_BASE_URL, then drives
+the routes at each concurrency level.
+
+    python -m benchmarks.bench_load --concurrency 1 10 50 --duration 10 \\
+        --latency 0.1 --jitter 0.05 --error-rate 0.01 --workers 1
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.stub_upstream import StubServer, create_replay_app, free_port
+
+ROUTES = {
+    'new': lambda i: f'/api/v1/movie/new?page={i}',
+    'number': lambda i: f'/api/v1/movie/number/abc-{i}',
+    'search': lambda i: f'/api/v1/movie/search/keyword{i}',
+    'playlists': lambda i: f'/api/v1/playlists?page={i}',
+    'actress_list': lambda i: f'/api/v1/actress/list?page={i}',
+}
+HEADERS = {'auth-key': 'user_uuid=bench', 'accept-language': 'en'}
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    return statistics.quantiles(samples, n=100, method='inclusive')[q - 1] if len(samples) > 1 else samples[0]
+
+
+async def drive(base_url: str, routes: list[str], concurrency: int, duration: float, distinct: int) -> dict:
+    paths = itertools.cycle([ROUTES[r](i) for i in range(1, distinct + 1) for r in routes])
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, headers=HEADERS, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(next(paths))
+                    ok = response.status_code == 200 and response.json().get('data') is not None
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += 0 if ok else 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / elapsed,
+        'p50': percentile(latencies, 50) * 1e3,
+        'p95': percentile(latencies, 95) * 1e3,
+        'p99': percentile(latencies, 99) * 1e3,
+    }
+
+
+def start_app(upstream_url: str, port: int, workers: int, env: dict) -> subprocess.Popen:
+    env = {**os.environ, **env, 'MISSCORE_UPSTREAM_BASE_URL': upstream_url}
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:misscore', '--host', '127.0.0.1',
+         '--port', str(port), '--workers', str(workers), '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(200):
+        try:
+            httpx.get(f'http://127.0.0.1:{port}/docs', timeout=1)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError('misscore did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--duration', type=float, default=10, help='seconds per concurrency level')
+    parser.add_argument('--routes', nargs='+', default=list(ROUTES), choices=list(ROUTES))
+    parser.add_argument('--distinct', type=int, default=20, help='distinct pages/numbers per route')
+    parser.add_argument('--latency', type=float, default=0.1)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--env', nargs='*', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the app, e.g. MISSCORE_CACHE_MAX_BYTES=0')
+    args = parser.parse_args()
+
+    stub_app = create_replay_app(args.latency, args.jitter, args.error_rate, seed=0)
+    port = free_port()
+    scratch = tempfile.TemporaryDirectory(prefix='bench_load_')
+    # 假上游不限流, 默认关掉限速, 测的是应用本身; 需要时用 --env 打开
+    # 假数据不能进入真正的目录和抓包目录: 关掉目录, 抓包写到临时目录
+    env = {'MISSCORE_GOVERNOR_RATE': '0', 'MISSCORE_GOVERNOR_SESSION_RATE': '0',
+           'MISSCORE_CATALOG_PATH': '', 'MISSCORE_CAPTURE_DIR': os.path.join(scratch.name, 'captures'),
+           **dict(item.split('=', 1) for item in args.env)}
+    with scratch, StubServer(stub_app) as stub:
+        process = start_app(stub.url, port, args.workers, env)
+        try:
+            print(f"{'concurrency':>11}{'requests':>10}{'errors':>8}{'rps':>9}"
+                  f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'upstream':>10}")
+            for concurrency in args.concurrency:
+                before = sum(stub_app.state.requests.values())
+                r = asyncio.run(drive(f'http://127.0.0.1:{port}', args.routes,
+                                      concurrency, args.duration, args.distinct))
+                upstream = sum(stub_app.state.requests.values()) - before
+                print(f"{concurrency:>11}{r['requests']:>10}{r['errors']:>8}{r['rps']:>9.1f}"
+                      f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{upstream:>10}")
+        finally:
+            process.terminate()
+            process.wait()
+
+
+if __name__ == '__main__':
+    main()
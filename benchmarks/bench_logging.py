@@ -0,0 +1,83 @@
+"""Per-call logging overhead on the request thread: synchronous handlers vs the queue pipeline.
+
+    python -m benchmarks.bench_logging --calls 20000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler
+
+from api.common.logging import setup_logging, stop_logging
+
+
+def sync_setup(log_dir: str):
+    # 旧实现: 处理器直接挂在根日志器上, 格式化和写文件都在调用方线程
+    formatter = logging.Formatter(
+        '[%(asctime)s] %(levelname)-8s [%(filename)s:%(lineno)d] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    for handler, level in ((logging.StreamHandler(), logging.DEBUG),
+                           (RotatingFileHandler(os.path.join(log_dir, 'app.log'),
+                                                maxBytes=10*1024*1024, backupCount=5, encoding='utf-8'), logging.INFO),
+                           (RotatingFileHandler(os.path.join(log_dir, 'error.log'),
+                                                maxBytes=5*1024*1024, backupCount=3), logging.ERROR)):
+        handler.setLevel(level)
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+
+
+def sync_teardown():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def measure(calls: int) -> float:
+    """microseconds per call spent in the caller, one request logs an info and a debug line"""
+    logger = logging.getLogger('api.v1.movie')
+    start = time.perf_counter()
+    for i in range(calls // 2):
+        logger.info('GET /api/v1/movie/%s 200 in %.1fms', 'abc-123', i * 0.01)
+        logger.debug('cache hit for %s', 'en|https://missav.ai/en/abc-123#parse_movie_detail')
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def run(name: str, calls: int, setup, teardown) -> dict:
+    with tempfile.TemporaryDirectory() as log_dir:
+        setup(log_dir)
+        per_call = measure(calls)
+        start = time.perf_counter()
+        teardown()
+        drain = time.perf_counter() - start
+    return {'name': name, 'per_call': per_call, 'drain': drain}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20000)
+    args = parser.parse_args()
+
+    # 控制台输出写到 /dev/null, 只测量开销
+    stderr, sys.stderr = sys.stderr, open(os.devnull, 'w')
+    try:
+        results = [
+            run('sync', args.calls, sync_setup, sync_teardown),
+            run('queue', args.calls, lambda d: setup_logging(d, level='DEBUG', fmt='text'), stop_logging),
+            run('queue-json', args.calls, lambda d: setup_logging(d, level='DEBUG', fmt='json'), stop_logging),
+        ]
+    finally:
+        sys.stderr.close()
+        sys.stderr = stderr
+
+    for r in results:
+        print(f"{r['name']:<12} {r['per_call']:7.2f} us/call on the caller, drain {r['drain'] * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
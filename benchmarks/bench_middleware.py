@@ -0,0 +1,119 @@
+"""Per-request CPU of the language middleware: BaseHTTPMiddleware vs pure ASGI, plain and streaming responses.
+
+    python -m benchmarks.bench_middleware --requests 5000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from api.common.middleware import LanguageMiddleware, translations
+
+# 真实客户端只会发少数几种 Accept-Language
+ACCEPT_LANGUAGES = [b'en-US,en;q=0.9', b'zh-CN,zh;q=0.9,en;q=0.8', b'ja,en-US;q=0.7,en;q=0.3', b'ko-KR,ko;q=0.9']
+
+
+class LegacyLanguageMiddleware(BaseHTTPMiddleware):
+    # 旧实现: BaseHTTPMiddleware, 每个请求重新解析 Accept-Language
+    async def dispatch(self, request: Request, call_next):
+        accept_language = request.headers.get("accept-language", translations['en'])
+        request.state.lang = self.select_language(self.parse_accept_language(accept_language))
+        request.state.response_headers = {}
+        response = await call_next(request)
+        response.headers["Content-Language"] = request.state.lang
+        response.headers.update(request.state.response_headers)
+        return response
+
+    def parse_accept_language(self, header: str):
+        langs = []
+        for part in header.split(","):
+            lang_part = part.split(";")[0].strip()
+            q = 1.0
+            if "q=" in part:
+                q = float(part.split("q=")[1].split(",")[0])
+            langs.append((lang_part, q))
+        if langs:
+            langs.sort(key=lambda x: x[1], reverse=True)
+        return langs
+
+    def select_language(self, langs) -> str:
+        if langs:
+            return translations.get(langs[0][0], translations['en'])
+        return translations['en']
+
+
+def create_app(middleware=None) -> FastAPI:
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware)
+
+    @app.get('/plain')
+    async def plain(request: Request):
+        return Response(b'{"lang":"%s"}' % getattr(request.state, 'lang', 'en').encode(),
+                        media_type='application/json')
+
+    @app.get('/stream')
+    async def stream():
+        async def body():
+            for i in range(10):
+                yield b'{"line":%d}\n' % i
+        return StreamingResponse(body(), media_type='application/x-ndjson')
+
+    return app
+
+
+async def call(app: FastAPI, path: str, accept_language: bytes) -> dict:
+    """one request straight through the ASGI app, no sockets or client in between"""
+    # spec_version 2.4 与 uvicorn 一致, 流式响应不再轮询 receive 等待断开
+    scope = {'type': 'http', 'asgi': {'version': '3.0', 'spec_version': '2.4'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'root_path': '', 'headers': [(b'accept-language', accept_language)],
+             'client': ('127.0.0.1', 0), 'server': ('bench', 80)}
+    headers = {}
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            headers.update(message['headers'])
+
+    await app(scope, receive, send)
+    return headers
+
+
+async def run(apps: dict, paths: list[str], total: int) -> dict:
+    result = {}
+    for path in paths:
+        for name, app in apps.items():
+            headers = await call(app, path, ACCEPT_LANGUAGES[1])
+            if name != 'none':
+                assert headers[b'content-language'] == b'cn', headers
+            start = time.process_time()
+            for i in range(total):
+                await call(app, path, ACCEPT_LANGUAGES[i % len(ACCEPT_LANGUAGES)])
+            result[(path.lstrip('/'), name)] = (time.process_time() - start) / total
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=5000)
+    args = parser.parse_args()
+
+    apps = {
+        'none': create_app(),
+        'base_http': create_app(LegacyLanguageMiddleware),
+        'asgi': create_app(LanguageMiddleware),
+    }
+    result = asyncio.run(run(apps, ['/plain', '/stream'], args.requests))
+    for (path, name), cpu in result.items():
+        overhead = cpu - result[(path, 'none')]
+        print(f'{path:<7} {name:<10} {cpu * 1e6:7.1f} µs CPU/request  middleware {overhead * 1e6:6.1f} µs')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Offline parser benchmarks over the recorded HTML corpus in benchmarks/fixtures.
+
+    python -m benchmarks.bench_parser                       # report
+    python -m benchmarks.bench_parser --save baseline.json  # record a baseline
+    python -m benchmarks.bench_parser --compare baseline.json --tolerance 0.15
+
+Pages that production parses while downloading (listings) are also timed through
+their streaming feed, reported as e.g. en/movie_list_60:stream.
+"""
+import argparse
+import json
+import pathlib
+import statistics
+import sys
+import time
+import tracemalloc
+
+from api.common import pasrer
+
+FIXTURES = pathlib.Path(__file__).parent / 'fixtures'
+PARSERS = {
+    'movie_list_12': pasrer.parse_movie_list,
+    'movie_list_60': pasrer.parse_movie_list,
+    'movie_search': pasrer.parse_movie_search,
+    'movie_detail': pasrer.parse_movie_detail,
+    'playlists': pasrer.parse_playlists,
+    'playlist_detail': pasrer.parse_playlist_detail,
+    'actress_list': pasrer.parse_actress_list,
+    'actress_ranking': pasrer.parse_actress_ranking,
+    'movie_genres': pasrer.parse_movie_genres,
+}
+# 模拟上游响应分块到达的大小
+STREAM_CHUNK = 16 * 1024
+
+
+def parse_page(text: str, parser):
+    tree = pasrer.parse_html(text)
+    pasrer.parse_login(tree)
+    return parser(tree)
+
+
+def stream_page(data: bytes, parser):
+    """same path as util._stream_and_parse of a listing route"""
+    feed = pasrer.STREAM_PARSERS[parser]('utf-8', True)
+    for offset in range(0, len(data), STREAM_CHUNK):
+        feed.feed(data[offset:offset + STREAM_CHUNK])
+        if feed.done:
+            break
+    return feed.close()
+
+
+def measure(page, parse, parser, rounds: int) -> dict:
+    """peak memory and allocations come from tracemalloc, so they cover Python objects, not libxml2's tree"""
+    parse(page, parser)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        parse(page, parser)
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = parse(page, parser)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocations = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del result
+    return {
+        'median_ms': statistics.median(samples) * 1e3,
+        'min_ms': min(samples) * 1e3,
+        'peak_kb': peak / 1024,
+        'allocations': allocations,
+        'size_kb': len(page if isinstance(page, bytes) else page.encode()) / 1024,
+    }
+
+
+def run(rounds: int, pattern: str) -> dict:
+    results = {}
+    for path in sorted(FIXTURES.glob(pattern)):
+        name = f'{path.parent.name}/{path.stem}'
+        parser = PARSERS[path.stem]
+        results[name] = measure(path.read_text(encoding='utf-8'), parse_page, parser, rounds)
+        if parser in pasrer.STREAM_PARSERS:
+            results[f'{name}:stream'] = measure(path.read_bytes(), stream_page, parser, rounds)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        limit = baseline[name]['median_ms'] * (1 + tolerance)
+        if result['median_ms'] > limit:
+            regressions.append(f"{name}: {result['median_ms']:.3f}ms > {limit:.3f}ms "
+                               f"(baseline {baseline[name]['median_ms']:.3f}ms)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--pattern', default='*/*.html', help='fixture glob, e.g. en/movie_list_*.html')
+    parser.add_argument('--save', type=pathlib.Path, help='write results as a baseline')
+    parser.add_argument('--compare', type=pathlib.Path, help='fail when slower than this baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args()
+
+    results = run(args.rounds, args.pattern)
+    print(f"{'page':<24}{'size KB':>9}{'median ms':>11}{'min ms':>9}{'peak KB':>10}{'allocs':>9}")
+    for name, r in results.items():
+        print(f"{name:<24}{r['size_kb']:>9.1f}{r['median_ms']:>11.3f}{r['min_ms']:>9.3f}"
+              f"{r['peak_kb']:>10.1f}{r['allocations']:>9}")
+
+    if args.save:
+        args.save.write_text(json.dumps(results, indent=2))
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        for line in regressions:
+            print(f'REGRESSION {line}', file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
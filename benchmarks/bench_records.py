@@ -0,0 +1,66 @@
+"""Memory held by 10k parsed movie cards: per-item dicts vs the slotted records the parsers produce.
+
+    python -m benchmarks.bench_records --cards 10000
+"""
+import argparse
+import gc
+import pathlib
+import sys
+import tracemalloc
+
+from api.common import pasrer
+
+FIXTURE = pathlib.Path(__file__).parent / 'fixtures' / 'en' / 'movie_list_60.html'
+
+
+def legacy_card(card) -> dict:
+    # 旧实现: 每张卡片一个 dict, 有字幕时才带 is_subtitle / subtitle
+    info = {
+        "title": card.title,
+        "link": card.link,
+        "number": card.number,
+        "cover": card.cover,
+        "preview": card.preview,
+        "duration": card.duration,
+    }
+    if card.is_subtitle:
+        info.update({'is_subtitle': True, 'subtitle': card.subtitle})
+    return info
+
+
+def parse_cards(text: str, total: int) -> list:
+    """parse the fixture until `total` cards, every page allocates its own strings like a real cache fill"""
+    cards = []
+    while len(cards) < total:
+        cards.extend(pasrer.parse_movie_list(pasrer.parse_html(text))[2])
+    return cards[:total]
+
+
+def measure(text: str, total: int, as_dict: bool) -> tuple[int, int]:
+    """(bytes still allocated, bytes in the containers alone) after keeping `total` cards"""
+    gc.collect()
+    tracemalloc.start()
+    cards = parse_cards(text, total)
+    if as_dict:
+        cards = [legacy_card(card) for card in cards]
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    containers = sum(sys.getsizeof(card) for card in cards) + sys.getsizeof(cards)
+    return held, containers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=10000)
+    args = parser.parse_args()
+
+    text = FIXTURE.read_text()
+    for name, as_dict in (('dict', True), ('record', False)):
+        held, containers = measure(text, args.cards, as_dict)
+        print(f'{name:<8} {held / 1024:9.1f} KiB held  {containers / 1024:9.1f} KiB in containers  '
+              f'{held / args.cards:6.0f} B/card')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Per-response CPU of a cached 60-item listing: pydantic response model vs orjson vs pre-encoded bytes.
+
+    python -m benchmarks.bench_serialize --requests 2000
+"""
+import argparse
+import asyncio
+import pathlib
+import time
+
+from fastapi import FastAPI
+
+from api.common import pasrer
+from api.common.cache import encode_payload
+from api.common.util import page_response
+from api.domain.model import BaseResponse, PageResult
+
+FIXTURE = pathlib.Path(__file__).parent / 'fixtures' / 'en' / 'movie_list_60.html'
+
+
+def create_app(ret: tuple) -> FastAPI:
+    app = FastAPI()
+    encoded = encode_payload(ret)
+
+    # 旧实现: 每次响应都经过 response_model 校验和 jsonable_encoder
+    @app.get('/pydantic', response_model=BaseResponse)
+    async def pydantic_route():
+        return BaseResponse(data=PageResult(current_page=1, page_size=ret[0], page_count=ret[1], data=ret[2]))
+
+    @app.get('/orjson', response_model=BaseResponse)
+    async def orjson_route():
+        return page_response(1, ret)
+
+    # 缓存命中: 条目上已有编码好的字节
+    @app.get('/cached', response_model=BaseResponse)
+    async def cached_route():
+        return page_response(1, ret, encoded)
+
+    return app
+
+
+async def call(app: FastAPI, path: str) -> int:
+    """one request straight through the ASGI app, no sockets or client in between"""
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+             'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+             'root_path': '', 'headers': [], 'client': ('127.0.0.1', 0), 'server': ('bench', 80)}
+    size = 0
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal size
+        if message['type'] == 'http.response.body':
+            size += len(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return size
+
+
+async def run(app: FastAPI, paths: list[str], total: int) -> dict:
+    result = {}
+    for path in paths:
+        size = await call(app, path)
+        start = time.process_time()
+        for _ in range(total):
+            await call(app, path)
+        result[path.lstrip('/')] = ((time.process_time() - start) / total, size)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    ret = pasrer.parse_movie_list(pasrer.parse_html(FIXTURE.read_text()))
+    result = asyncio.run(run(create_app(ret), ['/pydantic', '/orjson', '/cached'], args.requests))
+
+    baseline = result['pydantic'][0]
+    for name, (cpu, size) in result.items():
+        print(f'{name:<10} {cpu * 1e6:8.1f} µs CPU/response  {size} bytes  x{baseline / cpu:.1f}')
+
+
+if __name__ == '__main__':
+    main()
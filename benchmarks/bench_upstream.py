@@ -0,0 +1,59 @@
+"""Concurrent upstream throughput: blocking client vs the shared async client.
+
+    python -m benchmarks.bench_upstream --requests 100 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+# 比较的是客户端本身, 关掉上游限速和并发上限 (导入 api 之前设置)
+for name in ('MISSCORE_GOVERNOR_RATE', 'MISSCORE_GOVERNOR_SESSION_RATE', 'MISSCORE_GOVERNOR_CONCURRENCY'):
+    os.environ.setdefault(name, '0')
+
+from api.common import upstream  # noqa: E402
+from benchmarks.stub_upstream import StubServer, create_app
+
+
+async def blocking_handler(client: httpx.Client, url: str):
+    # 旧实现: async 路由里直接调用同步客户端, 会阻塞事件循环
+    return client.get(url)
+
+
+async def async_handler(url: str):
+    return await upstream.get(url)
+
+
+async def run(base_url: str, total: int) -> dict:
+    urls = [f'{base_url}/en/new?page={i}' for i in range(total)]
+
+    with httpx.Client() as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(blocking_handler(client, url) for url in urls))
+        blocking = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(async_handler(url) for url in urls))
+    concurrent = time.perf_counter() - start
+    await upstream.get_client().aclose()
+    return {'blocking': blocking, 'async': concurrent}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubServer(create_app(latency=args.latency)) as stub:
+        result = asyncio.run(run(stub.url, args.requests))
+
+    for name, elapsed in result.items():
+        print(f'{name:<10} {args.requests} requests in {elapsed:.3f}s '
+              f'({args.requests / elapsed:.1f} req/s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""Regenerate the recorded HTML corpus used by the parser benchmarks.
+
+The pages mirror the markup missav.ai served when the parsers were written
+(same class lists, nesting and boilerplate weight), with synthetic values.
+
+    python -m benchmarks.fixtures.generate
+"""
+import pathlib
+import random
+
+ROOT = pathlib.Path(__file__).parent
+LANGUAGES = {
+    'en': ('Release date:', 'Code:', 'Title:', 'Actress:', 'Genre:', 'Series:', 'Maker:', 'Director:', 'Label:', 'videos', 'Chinese subtitles'),
+    'cn': ('发行日期:', '番号:', '标题:', '女优:', '类型:', '系列:', '发行商:', '导演:', '标籤:', '部影片', '中文字幕'),
+    'ja': ('配信開始日:', '品番:', 'タイトル:', '女優:', 'ジャンル:', 'シリーズ:', 'メーカー:', '監督:', 'レーベル:', '本の動画', '中国語字幕'),
+}
+WORDS = {
+    'en': 'beautiful summer office lady secret night train teacher first love hot spring'.split(),
+    'cn': '美丽 夏天 办公室 秘密 夜晚 电车 老师 初恋 温泉 邻居'.split(),
+    'ja': '美しい 夏 オフィス 秘密 夜 電車 先生 初恋 温泉 隣人'.split(),
+}
+
+
+def title(rng: random.Random, lang: str, n: int = 8) -> str:
+    sep = '' if lang in ('cn', 'ja') else ' '
+    return sep.join(rng.choice(WORDS[lang]) for _ in range(n))
+
+
+def number(rng: random.Random) -> str:
+    return f"{rng.choice(['abc', 'ssis', 'ipx', 'midv', 'jur'])}-{rng.randint(100, 999)}"
+
+
+def layout(lang: str, body: str, head: str = '') -> str:
+    nav = ''.join(
+        f'<li><a href="https://missav.ai/{lang}/menu/{i}" class="block px-4 py-2 text-sm text-nord4 hover:bg-nord3">menu {i}</a></li>'
+        for i in range(60))
+    scripts = ''.join(
+        f'<script>window.dataLayer=window.dataLayer||[];function gtag{i}(){{dataLayer.push(arguments)}}'
+        f'{"var _x=" + repr("x" * 400) + ";" }</script>' for i in range(12))
+    return f'''<!DOCTYPE html>
+<html lang="{lang}">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>MissAV</title>
+{head}
+<link rel="stylesheet" href="https://missav.ai/build/app.css">
+{scripts}
+</head>
+<body class="bg-nord0">
+<header class="fixed z-30 w-full bg-nord0"><nav class="flex items-center justify-between"><ul class="hidden md:flex">{nav}</ul>
+<a href="https://missav.ai/{lang}/login" class="inline-flex items-center px-4 py-2 rounded-md text-white bg-nord10">Login</a></nav></header>
+<main class="mx-auto px-4 content-without-search pb-12">
+{body}
+</main>
+<footer class="bg-nord1">{nav}</footer>
+</body>
+</html>
+'''
+
+
+def pagination(lang: str, pages: int) -> str:
+    links = ''.join(
+        f'<a href="https://missav.ai/{lang}/new?page={i}" class="relative inline-flex items-center px-4 py-2" aria-label="Go to page {i}">{i}</a>'
+        for i in range(1, min(pages, 10) + 1))
+    last = f'<a href="https://missav.ai/{lang}/new?page={pages}" class="relative inline-flex items-center px-4 py-2" aria-label="Go to page {pages}">{pages}</a>'
+    return f'<nav role="navigation" class="flex items-center justify-between">{links}<span>...</span>{last}</nav>'
+
+
+def card(rng: random.Random, lang: str, subtitle: bool) -> str:
+    code = number(rng)
+    label = LANGUAGES[lang][10]
+    sub = (f'<a href="https://missav.ai/{lang}/{code}" alt="{code}"><span class="absolute bottom-1 left-1 rounded-lg px-2 py-1 text-xs text-nord5 bg-blue-800 bg-opacity-75">{label}</span></a>'
+           if subtitle else '')
+    return f'''<div class="thumbnail group">
+<div class="relative aspect-w-16 aspect-h-9 rounded overflow-hidden shadow-lg">
+<a href="https://missav.ai/{lang}/{code}" alt="{code}">
+<img x-cloak :class="{{ 'hidden': showPreview }}" class="w-full lozad" data-src="https://fourhoi.com/{code}/cover-t.jpg" alt="{title(rng, lang)}">
+<video x-cloak :class="{{ 'hidden': !showPreview }}" class="preview hide" loop muted playsinline data-src="https://fourhoi.com/{code}/preview.mp4"></video>
+</a>
+{sub}
+<a href="https://missav.ai/{lang}/{code}" alt="{code}"><span class="absolute bottom-1 right-1 rounded-lg px-2 py-1 text-xs text-nord5 bg-gray-800 bg-opacity-75">{rng.randint(1, 3)}:{rng.randint(10, 59)}:{rng.randint(10, 59)}</span></a>
+</div>
+<div class="my-2 text-sm text-nord4 truncate"><a class="text-secondary group-hover:text-primary" href="https://missav.ai/{lang}/{code}" alt="{code}">{code.upper()} {title(rng, lang)}</a></div>
+</div>'''
+
+
+def cards(rng: random.Random, lang: str, count: int) -> str:
+    items = ''.join(card(rng, lang, subtitle=i % 3 == 0) for i in range(count))
+    return f'<div class="grid grid-cols-2 md:grid-cols-3 xl:grid-cols-4 gap-5">{items}</div>'
+
+
+def actress_items(rng: random.Random, lang: str, count: int, ranking: bool = False) -> str:
+    items = []
+    for i in range(count):
+        name = title(rng, lang, 2)
+        link = f'https://missav.ai/{lang}/actresses/{name}'
+        extra = (f'<span class="text-nord9">{i + 1}</span>' if ranking else
+                 f'<p class="text-nord10">{rng.randint(10, 900)} {LANGUAGES[lang][9]}</p>'
+                 + (f'<p class="text-nord10">{rng.randint(2000, 2024)} debut</p>' if i % 2 else ''))
+        items.append(f'''<li>
+<div class="space-y-4">
+<a href="{link}"><div class="w-24 h-24 mx-auto rounded-full overflow-hidden"><img class="object-cover object-top w-full h-full" src="https://fourhoi.com/actress/{i}.jpg" alt="{name}"></div></a>
+<a href="{link}"><h4 class="text-nord13 truncate">{name}</h4>{extra}</a>
+</div>
+</li>''')
+    return f'<ul role="list" class="mx-auto grid grid-cols-2 gap-x-4 gap-y-8 sm:grid-cols-4">{"".join(items)}</ul>'
+
+
+def listing(rng, lang, count):
+    return layout(lang, cards(rng, lang, count) + pagination(lang, 500))
+
+
+def search(rng, lang, count):
+    actresses = f'<div class="max-w-full mb-6 text-nord4 rounded-lg">{actress_items(rng, lang, 6)}</div>'
+    return layout(lang, actresses + cards(rng, lang, count) + pagination(lang, 40))
+
+
+def detail(rng, lang, count):
+    code = number(rng)
+    labels = LANGUAGES[lang]
+    values = [f'{rng.randint(2015, 2024)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}', code.upper(), title(rng, lang, 12),
+              title(rng, lang, 2) + ', ' + title(rng, lang, 2), ', '.join(title(rng, lang, 1) for _ in range(5)),
+              title(rng, lang, 3), 'S1 NO.1 STYLE', title(rng, lang, 2), 'S1']
+    rows = ''.join(
+        f'<div class="text-secondary"><span>{label}</span>\n<a href="#" class="text-nord13 font-medium">{value}</a></div>'
+        for label, value in zip(labels[:9], values))
+    head = f'''<meta property="og:title" content="{code.upper()} {title(rng, lang, 12)}">
+<meta property="og:type" content="video.movie">
+<meta property="og:url" content="https://missav.ai/{lang}/{code}">
+<meta property="og:description" content="{title(rng, lang, 40)}">
+<meta property="og:image" content="https://fourhoi.com/{code}/cover-n.jpg">'''
+    body = f'''<div class="flex-1 order-first"><h1 class="text-base text-nord6">{code.upper()}</h1>
+<div x-data="{{ showMore: false }}"><div class="mb-1 text-secondary break-all line-clamp-2">{title(rng, lang, 60)}</div>
+<div class="space-y-2">{rows}</div></div></div>
+<div class="hidden lg:block">{cards(rng, lang, count)}</div>'''
+    return layout(lang, body, head)
+
+
+def genres(rng, lang, count):
+    items = ''.join(
+        f'<div><a class="text-nord13" href="https://missav.ai/{lang}/genres/{i}">{title(rng, lang, 1)}</a>'
+        f'<p class="text-nord10"><a href="#">{rng.randint(10, 9000)} {LANGUAGES[lang][9]}</a></p></div>'
+        for i in range(count))
+    grid = f'<div class="grid grid-cols-2 md:grid-cols-3 xl:grid-cols-4 gap-4">{items}</div>'
+    return layout(lang, grid + pagination(lang, 8))
+
+
+def actress_list(rng, lang, count):
+    div = f'<div class="max-w-full p-8 text-nord4 bg-nord1 rounded-lg">{actress_items(rng, lang, count)}</div>'
+    return layout(lang, div + pagination(lang, 1200))
+
+
+def actress_ranking(rng, lang, count):
+    div = f'<div class="max-w-full p-8 text-nord4 bg-nord1 rounded-lg">{actress_items(rng, lang, count, ranking=True)}</div>'
+    return layout(lang, div)
+
+
+def playlists(rng, lang, count):
+    items = []
+    for i in range(count):
+        ps = [f'<p class="text-nord13">{title(rng, lang, 3)}</p>', '<p><span>Public</span></p>',
+              f'<p><span>{title(rng, lang, 1)}</span></p>']
+        if i % 2:
+            ps.append(f'<p>{rng.randint(1, 90)} videos</p>')
+        ps.append(f'<p>Updated 2024-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}</p>')
+        items.append(f'<li><a href="https://missav.ai/{lang}/playlists/{rng.getrandbits(32):08x}">{"".join(ps)}</a></li>')
+    return layout(lang, f'<ul role="list" class="space-y-4">{"".join(items)}</ul>' + pagination(lang, 3))
+
+
+def playlist_detail(rng, lang, count):
+    comments = ''.join(
+        f'<textarea x-ref="comment" name="description" class="hidden">{title(rng, lang, 6)}</textarea>'
+        for _ in range(count))
+    return layout(lang, cards(rng, lang, count) + comments + pagination(lang, 2))
+
+
+PAGES = {
+    'movie_list_12': (listing, 12),
+    'movie_list_60': (listing, 60),
+    'movie_search': (search, 24),
+    'movie_detail': (detail, 12),
+    'playlists': (playlists, 20),
+    'playlist_detail': (playlist_detail, 12),
+    'actress_list': (actress_list, 36),
+    'actress_ranking': (actress_ranking, 50),
+    'movie_genres': (genres, 120),
+}
+
+
+def main():
+    for lang in LANGUAGES:
+        for name, (build, count) in PAGES.items():
+            rng = random.Random(f'{lang}-{name}')
+            path = ROOT / lang / f'{name}.html'
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(build(rng, lang, count), encoding='utf-8')
+            print(path.relative_to(ROOT), path.stat().st_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""A tiny local stand-in for missav.ai used by the benchmarks."""
+import asyncio
+import pathlib
+import random
+import re
+import socket
+import threading
+import time
+from collections import Counter
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse
+from starlette.routing import Route
+
+FIXTURES = pathlib.Path(__file__).parent / 'fixtures'
+PAGE = '<html><head><title>stub</title></head><body>' + 'x' * 64 * 1024 + '</body></html>'
+DETAIL_PATTERN = re.compile(r'/[A-Za-z0-9]+-\d+$')
+
+
+def create_app(latency: float = 0.05) -> Starlette:
+    async def page(request: Request):
+        await asyncio.sleep(latency)
+        return HTMLResponse(PAGE)
+
+    return Starlette(routes=[Route('/{path:path}', page)])
+
+
+def fixture_for(path: str) -> pathlib.Path:
+    """map an upstream path such as /dm291/en/today-hot to a recorded page"""
+    segments = path.strip('/').split('/')
+    lang = next((s for s in segments if (FIXTURES / s).is_dir()), 'en')
+    path = path.rstrip('/')
+    if '/search/' in path:
+        name = 'movie_search'
+    elif path.endswith('/actresses/ranking'):
+        name = 'actress_ranking'
+    elif path.endswith('/actresses'):
+        name = 'actress_list'
+    elif path.endswith(('/genres', '/makers')):
+        name = 'movie_genres'
+    elif '/playlists/' in path:
+        name = 'playlist_detail'
+    elif path.endswith('/playlists'):
+        name = 'playlists'
+    elif DETAIL_PATTERN.search(path):
+        name = 'movie_detail'
+    else:
+        name = 'movie_list_12'
+    return FIXTURES / lang / f'{name}.html'
+
+
+def create_replay_app(latency: float = 0.05, jitter: float = 0.0, error_rate: float = 0.0,
+                      seed: int | None = None) -> Starlette:
+    """Replay the recorded fixtures with latency, jitter and a random 503 rate.
+
+    `app.state.requests` counts upstream hits per path.
+    """
+    rng = random.Random(seed)
+    pages: dict[pathlib.Path, str] = {}
+
+    async def page(request: Request):
+        app.state.requests[request.url.path] += 1
+        await asyncio.sleep(max(0.0, latency + rng.uniform(-jitter, jitter)))
+        if rng.random() < error_rate:
+            return HTMLResponse('Service Unavailable', status_code=503)
+        path = fixture_for(request.url.path)
+        if path not in pages:
+            pages[path] = path.read_text(encoding='utf-8')
+        return HTMLResponse(pages[path])
+
+    app = Starlette(routes=[Route('/{path:path}', page, methods=['GET', 'POST', 'DELETE'])])
+    app.state.requests = Counter()
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class StubServer:
+    """Runs an ASGI app with uvicorn in a background thread."""
+
+    def __init__(self, app, port: int | None = None):
+        self.app = app
+        self.port = port or free_port()
+        self.server = uvicorn.Server(uvicorn.Config(
+            app, host='127.0.0.1', port=self.port, log_level='warning', lifespan='off'))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.port}'
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()